@@ -0,0 +1,29 @@
+"""
+Configuración y hooks de gunicorn
+
+Se usa junto con `--preload`: la aplicación se importa una sola vez en el proceso
+maestro y los workers heredan sus tablas constantes (plantillas, autómatas, regex)
+por copy-on-write en lugar de duplicarlas.
+"""
+import os
+
+# El maestro no abre conexiones: con gevent los hilos de precalentamiento también
+# sobrevivirían al fork y los sockets acabarían compartidos entre workers
+raw_env = ['PREWARM_CONNECTIONS=false']
+
+def post_fork(server, worker):
+    # Pools de conexiones y hilo de escritura de logs propios de cada worker:
+    # los del maestro no sobreviven al fork
+    if server.cfg.preload_app:
+        from src.config import get_config
+        from src.utils.logging_config import configure_logging
+        from src.routes.ai_assistant_enhanced import reset_connections
+        configure_logging(get_config().LOG_LEVEL)
+        reset_connections()
+
+    # Un worker por núcleo: cada uno conserva sus cachés de CPU calientes
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        cpu = cpus[(worker.age - 1) % len(cpus)]
+        os.sched_setaffinity(0, {cpu})
+        worker.log.info("Worker %s fijado a la CPU %s", worker.pid, cpu)
@@ -37,6 +37,9 @@ class Config:
     # Rate Limiting
     RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
     RATELIMIT_DEFAULT = config('RATELIMIT_DEFAULT', default='100/hour')
+    
+    # Logging
+    LOG_LEVEL = config('LOG_LEVEL', default='INFO')
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -47,6 +50,7 @@ class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
     TESTING = False
+    LOG_LEVEL = config('LOG_LEVEL', default='WARNING')
 
 class TestingConfig(Config):
     """Configuración para testing"""
@@ -61,7 +65,9 @@ config_dict = {
     'testing': TestingConfig
 }
 
+# El entorno se resuelve una sola vez al importar el módulo
+_ACTIVE_CONFIG = config_dict.get(config('FLASK_ENV', default='development'), DevelopmentConfig)
+
 def get_config():
     """Obtiene la configuración según el entorno"""
-    env = config('FLASK_ENV', default='development')
-    return config_dict.get(env, DevelopmentConfig)
+    return _ACTIVE_CONFIG
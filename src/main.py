@@ -11,10 +11,19 @@ from src.routes.ai_assistant_enhanced import ai_assistant_bp
 from src.routes.self_repair import self_repair_bp
 from src.routes.autonomous_deploy import autonomous_deploy_bp
 from src.routes.sandbox import sandbox_bp
+from src.utils.json_provider import OrjsonProvider
+from src.utils.logging_config import configure_logging
+from src.config import get_config
+
+# Los registros se escriben desde un hilo aparte (ver gunicorn.conf.py para los workers)
+configure_logging(get_config().LOG_LEVEL)
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
+# Serialización JSON con orjson para jsonify y request.get_json
+app.json = OrjsonProvider(app)
+
 # Habilitar CORS para todas las rutas
 CORS(app)
 
@@ -1,31 +1,173 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import cross_origin
-import json
+import orjson
 import time
 import openai
+import httpx
 import os
+import logging
+import threading
+import textwrap
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
+from tenacity import retry, wait_random_exponential, stop_after_attempt, retry_if_exception_type
+from src.config import Config
+from src.utils.conversation_store import ConversationStore
+from src.utils.cache import ResponseCache, hash_key
+from src.utils.batch_jobs import BatchQueue
 
 ai_assistant_bp = Blueprint("ai_assistant", __name__)
 
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  Necesario para HTTP/2 en httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Configurar cliente OpenAI (inicialización diferida)
 client = None
+_API_KEY = os.environ.get('OPENAI_API_KEY')
+
+def _build_http_client() -> httpx.Client:
+    """Cliente HTTP compartido con un pool amplio de conexiones keep-alive hacia la API"""
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=300),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
 
 def get_openai_client():
     global client
     if client is None:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        if not _API_KEY:
             raise Exception("OPENAI_API_KEY environment variable is not set")
-        client = openai.OpenAI(api_key=api_key)
+        # Los reintentos los gestiona create_chat_completion con backoff y jitter
+        client = openai.OpenAI(api_key=_API_KEY, http_client=_build_http_client(), max_retries=0)
     return client
 
+# Errores transitorios de OpenAI que justifican reintentar
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError
+)
+
+@retry(
+    wait=wait_random_exponential(min=1, max=20),
+    stop=stop_after_attempt(4),
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    reraise=True
+)
+def create_chat_completion(**params):
+    """Llama a chat.completions.create reintentando con backoff exponencial y jitter"""
+    return get_openai_client().chat.completions.create(**params)
+
+# Memoria de conversación: turnos recientes en crudo + resumen de los antiguos
+RECENT_MESSAGES = 8  # Últimos 4 turnos (usuario + asistente) enviados tal cual
+SUMMARY_BATCH = 4  # Mensajes fuera de la ventana que se acumulan antes de resumir
+SUMMARY_MODEL = "gpt-4o-mini"
+SESSION_LOCK_STRIPES = 64
+
+# Caché de respuestas para prompts repetidos
+RESPONSE_CACHE_TTL = 86400
+CHAT_CACHE_MAX_LENGTH = 200  # Solo se cachean preguntas cortas de primer turno
+
+# Presupuesto de tokens de salida: reservar de más aumenta la latencia
+CHAT_MAX_TOKENS = 400
+CODE_MAX_TOKENS = 800
+SHORT_QUESTION_LENGTH = 50
+SHORT_QUESTION_MAX_TOKENS = 256
+MAX_TOKENS_LIMIT = 2000
+
+# Enrutado de modelos: las consultas triviales van a un modelo más barato y rápido
+DEFAULT_MODEL = "gpt-3.5-turbo"
+LIGHT_MODEL = "gpt-4o-mini"
+LIGHT_MODEL_MAX_LENGTH = 120
+HEAVY_KEYWORDS = ("code", "código", "error", "stacktrace", "traceback", "```")
+
+# Chat por lotes: pool compartido para no exceder el límite de peticiones por minuto
+BATCH_CONCURRENCY = 20
+MAX_BATCH_SIZE = 100
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='chat-batch')
+
+# Prompts estáticos: se eliminan al importar la indentación del código fuente,
+# que de otro modo se enviaría a OpenAI como tokens de espacio en blanco
+BASE_SYSTEM_PROMPT = textwrap.dedent("""\
+    Eres un asistente de IA especializado en programación y desarrollo de software.
+    Puedes ayudar con:
+    - Generación de código en Python, JavaScript, React, Flask
+    - Explicación de conceptos de programación
+    - Debugging y solución de problemas
+    - Arquitectura de software
+    - Mejores prácticas de desarrollo
+
+    Responde de manera clara, concisa y práctica. Si generas código, incluye comentarios explicativos.
+""").strip()
+
+CODE_PROMPT_TEMPLATE = textwrap.dedent("""\
+    Genera código {language}{framework} para:
+    {description}
+
+    Requisitos:
+    - Código limpio y bien comentado
+    - Manejo de errores apropiado
+    - Mejores prácticas del lenguaje
+    - Funcional y listo para usar
+
+    Proporciona solo el código sin explicaciones adicionales.
+""").strip()
+
+# Guía de estilo estática que forma parte del prefijo fijo del prompt de sistema.
+# OpenAI cachea automáticamente prefijos idénticos de 1024 tokens o más, así que
+# este texto no debe contener valores variables (fechas, ids, etc.).
+CODING_STYLE_GUIDE = """Guía de estilo para el código que generes:
+
+Python:
+- Sigue PEP 8: nombres en snake_case para funciones y variables, PascalCase para clases y MAYÚSCULAS para constantes.
+- Usa anotaciones de tipo en las firmas públicas y docstrings breves que expliquen qué hace la función, sus argumentos y lo que devuelve.
+- Prefiere f-strings para formatear texto, comprensiones de listas claras y la biblioteca estándar antes que dependencias externas.
+- Maneja los errores con excepciones específicas; no silencies errores con un except vacío.
+- Usa context managers (with) para archivos, conexiones y locks.
+- En Flask organiza las rutas en Blueprints, valida la entrada con request.get_json() y devuelve siempre JSON con jsonify y el código HTTP adecuado.
+
+JavaScript y React:
+- Usa const y let, nunca var; funciones flecha para callbacks y async/await en lugar de cadenas de then.
+- Escribe componentes funcionales con hooks (useState, useEffect, useMemo) y mantén cada componente enfocado en una sola responsabilidad.
+- Gestiona los estados de carga y error de forma explícita y muestra mensajes comprensibles al usuario.
+- Usa clases de Tailwind para el estilo cuando el proyecto ya lo utilice.
+
+Pruebas:
+- Acompaña las funciones no triviales con un ejemplo de prueba (pytest en Python, Jest en JavaScript).
+- Cubre el caso normal, los casos límite y al menos un caso de error.
+- Evita dependencias de red o de reloj en las pruebas; usa fixtures o mocks.
+
+General:
+- Explica brevemente la solución antes del código y, si hay varias alternativas, indica cuál recomiendas y por qué.
+- Incluye comentarios en español solo donde aporten contexto que el código no expresa por sí mismo.
+- Señala los riesgos de seguridad relevantes: validación de entradas, secretos en variables de entorno, inyección SQL y de comandos.
+- Si la pregunta es ambigua, indica las suposiciones que haces en lugar de inventar requisitos.
+- Formatea el código en bloques markdown indicando el lenguaje.
+- Mantén las respuestas centradas en la pregunta; evita relleno y repeticiones."""
+
 class AIAssistant:
     """Asistente de IA con capacidades de chat y generación de código"""
     
     def __init__(self):
-        self.conversation_history = {}
+        # Historial persistido en Redis (REDIS_URL) o en memoria si no está disponible
+        self.conversation_history = ConversationStore(Config.REDIS_URL)
+        # Locks repartidos por hash de sesión: los turnos concurrentes de una sesión no se
+        # pisan y el número de locks no crece con cada session_id nuevo
+        self._locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        # Sesiones con un resumen en curso (se protege con el lock de cada sesión)
+        self._summarizing = set()
+        self.response_cache = ResponseCache(Config.REDIS_URL, prefix='ai', ttl=RESPONSE_CACHE_TTL)
+        # Generaciones de código diferidas: 50% más baratas vía Batch API
+        self.batch_queue = BatchQueue(get_openai_client, Config.REDIS_URL)
         self.code_templates = {
             'flask_api': '''
 from flask import Flask, jsonify, request
@@ -110,63 +252,196 @@ if __name__ == '__main__':
     main()
 '''
         }
+        
+        # El prompt de sistema incluye el catálogo de plantillas
+        self.system_message = self._build_system_message()
     
-    def get_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _build_system_message(self) -> Dict[str, str]:
+        """Construye el prompt de sistema, idéntico byte a byte en todas las peticiones"""
+        templates = "\n\n".join(
+            f"### {name}\n{template.strip()}" for name, template in self.code_templates.items()
+        )
+        
+        return {
+            "role": "system",
+            "content": f"{BASE_SYSTEM_PROMPT}\n\n{CODING_STYLE_GUIDE}\n\nPlantillas de referencia del proyecto:\n\n{templates}"
+        }
+    
+    def _build_messages(self, message: str, history: List[Dict[str, Any]],
+                        memory: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """Construye la lista de mensajes que se envía a OpenAI"""
+        # El prompt de sistema va siempre primero para aprovechar la caché de prefijos
+        messages = [self.system_message]
+        
+        # Agregar resumen de turnos antiguos y mensajes aún no resumidos
+        if memory:
+            if memory['summary']:
+                messages.append({"role": "system", "content": f"Resumen previo de la conversación: {memory['summary']}"})
+            messages.extend(memory['pending'])
+        
+        # Agregar historial reciente (últimos turnos completos)
+        for msg in history[-RECENT_MESSAGES:]:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+        
+        # Agregar mensaje actual
+        messages.append({"role": "user", "content": message})
+        
+        return messages
+    
+    def _save_turn(self, session_id: str, message: str, ai_response: str, now: float = None):
+        """Guarda el turno (usuario + asistente) en el historial de la sesión"""
+        # Las marcas de tiempo se guardan como epoch; se formatean solo al exponer el historial
+        now = now or time.time()
+        summarize = False
+        with self._locks[hash(session_id) % SESSION_LOCK_STRIPES]:
+            # Releer el estado dentro del lock: otro turno pudo guardarse mientras tanto
+            history = self.conversation_history.get_messages(session_id, RECENT_MESSAGES)
+            
+            # El almacenamiento conserva solo los últimos 20 mensajes
+            self.conversation_history.append_messages(session_id, [
+                {"role": "user", "content": message, "timestamp": now},
+                {"role": "assistant", "content": ai_response, "timestamp": now}
+            ])
+            
+            # El turno más antiguo de la ventana reciente pasa a la cola de resumen
+            if len(history) >= RECENT_MESSAGES:
+                memory = self.conversation_history.get_memory(session_id) or {'summary': '', 'pending': []}
+                for msg in history[:2]:
+                    memory['pending'].append({"role": msg["role"], "content": msg["content"]})
+                
+                # Si el resumen falla repetidamente, la cola no crece sin límite (no se
+                # recorta con un resumen en curso: este retirará los que ya ha resumido)
+                in_progress = session_id in self._summarizing
+                if not in_progress:
+                    memory['pending'] = memory['pending'][-SUMMARY_BATCH * 2:]
+                self.conversation_history.set_memory(session_id, memory)
+                
+                # Resumir cada SUMMARY_BATCH mensajes para amortizar el coste
+                summarize = len(memory['pending']) >= SUMMARY_BATCH and not in_progress
+                if summarize:
+                    self._summarizing.add(session_id)
+        
+        # La llamada al modelo (con reintentos) va fuera del lock y del camino de la
+        # respuesta: no bloquea a las demás sesiones que comparten el mismo lock
+        if summarize:
+            threading.Thread(
+                target=self._update_summary,
+                args=(session_id, memory['summary'], list(memory['pending'])),
+                daemon=True
+            ).start()
+    
+    def _update_summary(self, session_id: str, summary: str, pending: List[Dict[str, str]]):
+        """Fusiona los mensajes pendientes con el resumen existente usando un modelo económico"""
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in pending)
+        prompt = (
+            "Resume de forma concisa la siguiente conversación entre un usuario y un asistente de programación, "
+            "fusionándola con el resumen previo. Conserva decisiones, requisitos y fragmentos de código relevantes.\n\n"
+            f"Resumen previo:\n{summary or '(vacío)'}\n\n"
+            f"Nuevos mensajes:\n{transcript}"
+        )
+        
+        try:
+            response = create_chat_completion(
+                model=SUMMARY_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=300,
+                temperature=0.3
+            )
+            new_summary = response.choices[0].message.content
+        except Exception:
+            # Si falla el resumen se siguen enviando los pendientes; se reintentará con
+            # el siguiente turno
+            new_summary = None
+        
+        with self._locks[hash(session_id) % SESSION_LOCK_STRIPES]:
+            self._summarizing.discard(session_id)
+            if new_summary is None:
+                return
+            memory = self.conversation_history.get_memory(session_id) or {'summary': '', 'pending': []}
+            # Solo se retiran los mensajes resumidos; los llegados mientras tanto siguen pendientes
+            memory['summary'] = new_summary
+            memory['pending'] = memory['pending'][len(pending):]
+            self.conversation_history.set_memory(session_id, memory)
+    
+    def _create_completion(self, cacheable: bool = False, **params) -> tuple:
+        """Llama a OpenAI reutilizando la respuesta cacheada si el prompt ya se envió antes"""
+        key = None
+        if cacheable:
+            key = hash_key(params['model'], str(params.get('max_tokens')),
+                           orjson.dumps(params['messages'], option=orjson.OPT_SORT_KEYS).decode())
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached, True
+        
+        response = create_chat_completion(**params)
+        content = response.choices[0].message.content
+        
+        usage = getattr(response, 'usage', None)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        if details is not None:
+            logger.debug("Tokens de prompt cacheados: %s/%s", details.cached_tokens, usage.prompt_tokens)
+        
+        if key is not None:
+            self.response_cache.set(key, content)
+        
+        return content, False
+    
+    def _resolve_max_tokens(self, requested: Optional[int], default: int, message: str = None) -> int:
+        """Límite de tokens de salida: el pedido por el cliente (acotado) o el por defecto"""
+        # bool es subclase de int: True no es un límite válido
+        if requested and not isinstance(requested, bool):
+            return max(1, min(int(requested), MAX_TOKENS_LIMIT))
+        if message is not None and len(message) < SHORT_QUESTION_LENGTH:
+            return SHORT_QUESTION_MAX_TOKENS
+        return default
+    
+    def _pick_model(self, message: str, history: List[Dict[str, Any]]) -> str:
+        """Elige el modelo según la dificultad aparente del mensaje"""
+        text = message.lower()
+        # Una conversación que ya trata sobre código (depuración en varios turnos) sigue en el modelo fuerte
+        in_code_thread = any('```' in msg.get('content', '') for msg in history[-2:])
+        
+        if (len(message) < LIGHT_MODEL_MAX_LENGTH and '\n' not in message.strip()
+                and not in_code_thread and not any(kw in text for kw in HEAVY_KEYWORDS)):
+            model = LIGHT_MODEL
+        else:
+            model = DEFAULT_MODEL
+        
+        logger.info("Enrutado de modelo: %s (longitud=%d, historial=%d)", model, len(message), len(history))
+        return model
+    
+    def get_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None,
+                        max_tokens: Optional[int] = None) -> Dict[str, Any]:
         """Obtiene respuesta de la IA usando OpenAI"""
         try:
             # Obtener historial de conversación
-            if session_id not in self.conversation_history:
-                self.conversation_history[session_id] = []
-            
-            history = self.conversation_history[session_id]
+            history = self.conversation_history.get_messages(session_id, RECENT_MESSAGES)
+            memory = self.conversation_history.get_memory(session_id)
             
             # Preparar mensajes para OpenAI
-            messages = [
-                {
-                    "role": "system",
-                    "content": """Eres un asistente de IA especializado en programación y desarrollo de software. 
-                    Puedes ayudar con:
-                    - Generación de código en Python, JavaScript, React, Flask
-                    - Explicación de conceptos de programación
-                    - Debugging y solución de problemas
-                    - Arquitectura de software
-                    - Mejores prácticas de desarrollo
-                    
-                    Responde de manera clara, concisa y práctica. Si generas código, incluye comentarios explicativos."""
-                }
-            ]
+            messages = self._build_messages(message, history, memory)
             
-            # Agregar historial reciente (últimos 10 mensajes)
-            for msg in history[-10:]:
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            # Agregar mensaje actual
-            messages.append({"role": "user", "content": message})
+            # Las preguntas cortas de primer turno (tipo FAQ) se sirven desde caché
+            cacheable = not history and not memory and len(message) <= CHAT_CACHE_MAX_LENGTH
             
             # Llamar a OpenAI
-            response = get_openai_client().chat.completions.create(
-                model="gpt-3.5-turbo",
+            ai_response, cached = self._create_completion(
+                cacheable,
+                model=self._pick_model(message, history),
                 messages=messages,
-                max_tokens=1500,
+                max_tokens=self._resolve_max_tokens(max_tokens, CHAT_MAX_TOKENS, message),
                 temperature=0.7
             )
             
-            ai_response = response.choices[0].message.content
-            
             # Guardar en historial
-            history.append({"role": "user", "content": message, "timestamp": datetime.now().isoformat()})
-            history.append({"role": "assistant", "content": ai_response, "timestamp": datetime.now().isoformat()})
-            
-            # Mantener solo los últimos 20 mensajes
-            if len(history) > 20:
-                history = history[-20:]
-            
-            self.conversation_history[session_id] = history
+            now = time.time()
+            self._save_turn(session_id, message, ai_response, now)
             
             return {
                 'response': ai_response,
                 'session_id': session_id,
-                'timestamp': datetime.now().isoformat(),
+                'cached': cached,
+                'timestamp': datetime.fromtimestamp(now).isoformat(),
                 'status': 'success'
             }
             
@@ -178,37 +453,73 @@ if __name__ == '__main__':
                 'status': 'error'
             }
     
-    def generate_code(self, description: str, language: str = 'python', framework: str = None) -> Dict[str, Any]:
-        """Genera código basado en descripción"""
+    def stream_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None,
+                           max_tokens: Optional[int] = None):
+        """Obtiene respuesta de la IA en streaming como eventos SSE"""
         try:
-            # Preparar prompt específico para generación de código
-            prompt = f"""
-            Genera código {language} {'usando ' + framework if framework else ''} para:
-            {description}
+            history = self.conversation_history.get_messages(session_id, RECENT_MESSAGES)
+            memory = self.conversation_history.get_memory(session_id)
+            messages = self._build_messages(message, history, memory)
             
-            Requisitos:
-            - Código limpio y bien comentado
-            - Manejo de errores apropiado
-            - Mejores prácticas del lenguaje
-            - Funcional y listo para usar
+            # Llamar a OpenAI en modo streaming
+            response = create_chat_completion(
+                model=self._pick_model(message, history),
+                messages=messages,
+                max_tokens=self._resolve_max_tokens(max_tokens, CHAT_MAX_TOKENS, message),
+                temperature=0.7,
+                stream=True
+            )
             
-            Proporciona solo el código sin explicaciones adicionales.
-            """
+            # Reenviar cada fragmento al cliente a medida que llega
+            chunks = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield b"data: " + orjson.dumps({'delta': delta}) + b"\n\n"
             
-            response = get_openai_client().chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2000,
-                temperature=0.3
-            )
+            # Guardar en historial una vez completada la respuesta
+            now = time.time()
+            self._save_turn(session_id, message, ''.join(chunks), now)
             
-            generated_code = response.choices[0].message.content
+            yield b"data: " + orjson.dumps({'done': True, 'session_id': session_id, 'timestamp': datetime.fromtimestamp(now).isoformat(), 'status': 'success'}) + b"\n\n"
+            
+        except Exception as e:
+            yield b"data: " + orjson.dumps({'error': f'Error al obtener respuesta de IA: {str(e)}', 'session_id': session_id, 'timestamp': datetime.now().isoformat(), 'status': 'error'}) + b"\n\n"
+    
+    def _code_generation_params(self, description: str, language: str, framework: str = None,
+                                max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Parámetros de chat completions para una petición de generación de código"""
+        prompt = CODE_PROMPT_TEMPLATE.format_map({
+            'language': language,
+            'framework': f' usando {framework}' if framework else '',
+            'description': description
+        })
+        
+        return {
+            'model': DEFAULT_MODEL,
+            'messages': [{"role": "user", "content": prompt}],
+            'max_tokens': self._resolve_max_tokens(max_tokens, CODE_MAX_TOKENS),
+            'temperature': 0.3
+        }
+    
+    def generate_code(self, description: str, language: str = 'python', framework: str = None,
+                      max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Genera código basado en descripción"""
+        try:
+            # El prompt es determinista a partir de la descripción: se cachea siempre
+            generated_code, cached = self._create_completion(
+                True, **self._code_generation_params(description, language, framework, max_tokens)
+            )
             
             return {
                 'code': generated_code,
                 'language': language,
                 'framework': framework,
                 'description': description,
+                'cached': cached,
                 'timestamp': datetime.now().isoformat(),
                 'status': 'success'
             }
@@ -220,6 +531,45 @@ if __name__ == '__main__':
                 'status': 'error'
             }
     
+    def generate_code_async(self, description: str, language: str = 'python', framework: str = None,
+                            max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Encola la generación de código en la Batch API y devuelve un job_id"""
+        try:
+            job_id = self.batch_queue.submit(
+                self._code_generation_params(description, language, framework, max_tokens),
+                metadata={'language': language, 'framework': framework, 'description': description}
+            )
+            return {
+                'job_id': job_id,
+                'timestamp': datetime.now().isoformat(),
+                'status': 'queued'
+            }
+            
+        except Exception as e:
+            return {
+                'error': f'Error encolando generación de código: {str(e)}',
+                'timestamp': datetime.now().isoformat(),
+                'status': 'error'
+            }
+    
+    def get_code_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el estado o resultado de una generación de código diferida"""
+        job = self.batch_queue.get_job(job_id)
+        if job is None:
+            return None
+        
+        result = {
+            'job_id': job_id,
+            **job.get('metadata', {}),
+            'timestamp': datetime.now().isoformat(),
+            'status': job['status']
+        }
+        if job['status'] == 'completed':
+            result['code'] = job['content']
+        elif job['status'] == 'error':
+            result['error'] = f"Error generando código: {job.get('error', '')}"
+        return result
+    
     def get_code_template(self, template_type: str) -> Dict[str, Any]:
         """Obtiene plantilla de código predefinida"""
         if template_type in self.code_templates:
@@ -240,6 +590,20 @@ if __name__ == '__main__':
 # Instancia global del asistente
 ai_assistant = AIAssistant()
 
+# Las plantillas son estáticas: sus respuestas JSON se serializan una sola vez
+_TEMPLATES_JSON = orjson.dumps({
+    'templates': list(ai_assistant.code_templates.keys()),
+    'status': 'success'
+})
+_TEMPLATE_JSON = {
+    template_type: orjson.dumps({
+        'template': template,
+        'type': template_type,
+        'status': 'success'
+    })
+    for template_type, template in ai_assistant.code_templates.items()
+}
+
 @ai_assistant_bp.route("/chat", methods=["POST"])
 @cross_origin()
 def chat():
@@ -249,46 +613,112 @@ def chat():
         message = data.get('message', '')
         session_id = data.get('session_id', f'session_{int(time.time())}')
         context = data.get('context', {})
+        max_tokens = data.get('max_tokens')
         
         if not message:
             return jsonify({"error": "Mensaje requerido"}), 400
         
-        response = ai_assistant.get_ai_response(message, session_id, context)
+        if max_tokens is not None and (isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0):
+            return jsonify({"error": "max_tokens debe ser un entero positivo"}), 400
+        
+        # Streaming SSE opcional para reducir la latencia del primer token
+        if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+            return Response(
+                stream_with_context(ai_assistant.stream_ai_response(message, session_id, context, max_tokens)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        response = ai_assistant.get_ai_response(message, session_id, context, max_tokens)
         return jsonify(response), 200
         
     except Exception as e:
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
 
+@ai_assistant_bp.route("/chat/batch", methods=["POST"])
+@cross_origin()
+def chat_batch():
+    """Endpoint para procesar varios mensajes en paralelo (respuestas en el mismo orden)"""
+    try:
+        data = request.get_json()
+        items = data.get('messages', [])
+        
+        if not items or not isinstance(items, list):
+            return jsonify({"error": "Lista de mensajes requerida"}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Máximo {MAX_BATCH_SIZE} mensajes por lote"}), 400
+        if not all(isinstance(item, dict) and item.get('message') for item in items):
+            return jsonify({"error": "Cada elemento requiere un mensaje"}), 400
+        
+        # Sin session_id explícito, cada elemento abre una sesión nueva: el id no puede
+        # depender del reloj, o dos lotes en el mismo segundo compartirían historial
+        batch_id = uuid.uuid4().hex
+        results = list(_batch_executor.map(
+            lambda indexed: ai_assistant.get_ai_response(
+                indexed[1]['message'],
+                indexed[1].get('session_id', f'session_{batch_id}_{indexed[0]}'),
+                indexed[1].get('context', {})
+            ),
+            enumerate(items)
+        ))
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'timestamp': datetime.now().isoformat(),
+            'status': 'success'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
 @ai_assistant_bp.route("/generate-code", methods=["POST"])
 @cross_origin()
 def generate_code():
-    """Endpoint para generar código"""
+    """Endpoint para generar código (?async=true lo encola en la Batch API)"""
     try:
         data = request.get_json()
         description = data.get('description', '')
         language = data.get('language', 'python')
         framework = data.get('framework')
+        max_tokens = data.get('max_tokens')
         
         if not description:
             return jsonify({"error": "Descripción requerida"}), 400
         
-        response = ai_assistant.generate_code(description, language, framework)
+        if max_tokens is not None and (isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens <= 0):
+            return jsonify({"error": "max_tokens debe ser un entero positivo"}), 400
+        
+        if request.args.get('async', '').lower() == 'true':
+            response = ai_assistant.generate_code_async(description, language, framework, max_tokens)
+            return jsonify(response), 202 if response['status'] == 'queued' else 500
+        
+        response = ai_assistant.generate_code(description, language, framework, max_tokens)
         return jsonify(response), 200
         
     except Exception as e:
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
 
+@ai_assistant_bp.route("/generate-code/result/<job_id>", methods=["GET"])
+@cross_origin()
+def get_generate_code_result(job_id):
+    """Endpoint para consultar una generación de código diferida"""
+    try:
+        response = ai_assistant.get_code_job(job_id)
+        if response is None:
+            return jsonify({"error": f"Trabajo {job_id} no encontrado"}), 404
+        
+        return jsonify(response), 200 if response['status'] in ('completed', 'error') else 202
+        
+    except Exception as e:
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
 @ai_assistant_bp.route("/templates", methods=["GET"])
 @cross_origin()
 def get_templates():
     """Endpoint para obtener plantillas disponibles"""
     try:
-        templates = list(ai_assistant.code_templates.keys())
-        return jsonify({
-            'templates': templates,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
+        return Response(_TEMPLATES_JSON, mimetype='application/json')
         
     except Exception as e:
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
@@ -298,6 +728,9 @@ def get_templates():
 def get_template(template_type):
     """Endpoint para obtener una plantilla específica"""
     try:
+        if template_type in _TEMPLATE_JSON:
+            return Response(_TEMPLATE_JSON[template_type], mimetype='application/json')
+        
         response = ai_assistant.get_code_template(template_type)
         return jsonify(response), 200
         
@@ -309,10 +742,17 @@ def get_template(template_type):
 def get_conversation(session_id):
     """Endpoint para obtener historial de conversación"""
     try:
-        history = ai_assistant.conversation_history.get(session_id, [])
+        # Los mensajes antiguos pueden tener ya la marca en ISO
+        history = [
+            {**msg, 'timestamp': datetime.fromtimestamp(msg['timestamp']).isoformat()}
+            if isinstance(msg.get('timestamp'), (int, float)) else msg
+            for msg in ai_assistant.conversation_history.get_messages(session_id)
+        ]
+        memory = ai_assistant.conversation_history.get_memory(session_id)
         return jsonify({
             'session_id': session_id,
             'history': history,
+            'summary': memory['summary'] if memory else '',
             'message_count': len(history),
             'timestamp': datetime.now().isoformat(),
             'status': 'success'
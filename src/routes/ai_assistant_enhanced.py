@@ -1,36 +1,154 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import cross_origin
-import json
+import orjson
 import time
-import openai
-import requests
+from openai import OpenAI, OpenAIError
+import httpx
 import os
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from functools import wraps
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import re
+from src.config import Config
+from src.utils.cache import ResponseCache, hash_key
+from src.utils.clock import now_iso
+from src.utils.conversation_store import ConversationStore
+from src.utils.json_provider import json_response
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import h2  # noqa: F401  Necesario para HTTP/2 en httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 ai_assistant_bp = Blueprint("ai_assistant", __name__)
 
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = "https://api.duckduckgo.com/"
+
+def _build_http_clients():
+    """Crea los pools de conexiones HTTP del proceso"""
+    # Búsquedas: reutiliza conexiones keep-alive y reintenta los fallos de conexión
+    # sin abrir un socket TLS nuevo por búsqueda
+    search_http = httpx.Client(
+        transport=httpx.HTTPTransport(
+            retries=2,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=120)
+        ),
+        timeout=10,
+        follow_redirects=True
+    )
+    # Pool de conexiones hacia la API de OpenAI, compartido por todos los hilos del worker;
+    # con HTTP/2 las peticiones concurrentes se multiplexan sobre la misma conexión TLS
+    openai_http = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+    return search_http, openai_http
+
+_http, _openai_http = _build_http_clients()
+
 # Configurar cliente OpenAI (inicialización diferida)
 client = None
 
+# Cuerpos de error fijos: el detalle de la excepción va al log, no al cliente
+_ERR_AI = orjson.dumps({'error': 'Error al obtener respuesta de IA', 'status': 'error'})
+_ERR_INTERNAL = orjson.dumps({'error': 'Error interno', 'status': 'error'})
+
+def json_endpoint(fn):
+    """Serializa el resultado del endpoint y centraliza el manejo de errores
+
+    El endpoint puede devolver un dict, una tupla (dict, código) o un Response ya construido.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except OpenAIError as e:
+            logger.warning("Error de OpenAI en %s: %s", fn.__name__, e)
+            return json_response(_ERR_AI, 502)
+        except Exception:
+            logger.exception("Error en el endpoint %s", fn.__name__)
+            return json_response(_ERR_INTERNAL, 500)
+        
+        if isinstance(result, tuple):
+            body, status = result
+            return jsonify(body), status
+        if isinstance(result, dict):
+            return jsonify(result)
+        return result
+    return wrapper
+
 def get_openai_client():
     global client
     if client is None:
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise Exception("OPENAI_API_KEY environment variable is not set")
-        client = openai.OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, http_client=_openai_http)
     return client
 
-class EnhancedAIAssistant:
-    """Asistente de IA mejorado con capacidades de búsqueda en internet"""
-    
-    def __init__(self):
-        self.conversation_history = {}
-        self.search_history = []
-        self.code_templates = {
-            'flask_api': '''
+def _prewarm_connections():
+    """Abre de antemano las conexiones TLS hacia OpenAI y DuckDuckGo"""
+    for http_client, url in ((_http, SEARCH_URL), (_openai_http, "https://api.openai.com/v1/")):
+        try:
+            http_client.head(url)
+        except Exception:
+            pass
+
+def _start_prewarm():
+    # En segundo plano para no retrasar el arranque del proceso
+    threading.Thread(target=_prewarm_connections, daemon=True).start()
+
+def reset_connections():
+    """Descarta los pools heredados y abre conexiones propias del proceso
+
+    Con `gunicorn --preload` el módulo se importa en el proceso maestro: las tablas
+    constantes se comparten con los workers por copy-on-write, pero los sockets no
+    pueden compartirse, así que cada worker llama a esta función tras el fork.
+    """
+    global _http, _openai_http, client
+    _http, _openai_http = _build_http_clients()
+    client = None
+    _start_prewarm()
+
+# Con --preload cada worker precalienta sus conexiones tras el fork (ver gunicorn.conf.py)
+if os.getenv('PREWARM_CONNECTIONS', 'true').lower() == 'true':
+    _start_prewarm()
+
+CHAT_SYSTEM_MESSAGE = """Eres un asistente de IA especializado en programación y desarrollo de software con acceso a información actualizada de internet. 
+
+Puedes ayudar con:
+- Generación de código en Python, JavaScript, React, Flask
+- Explicación de conceptos de programación
+- Debugging y solución de problemas
+- Arquitectura de software
+- Mejores prácticas de desarrollo
+- Información actualizada sobre tecnologías y tendencias
+- Búsquedas y consultas de información en tiempo real
+
+Si tienes información de búsquedas de internet, úsala para proporcionar respuestas más precisas y actualizadas.
+
+Responde de manera clara, concisa y práctica. Si generas código, incluye comentarios explicativos."""
+
+# Plantillas de código estáticas, compartidas por todas las peticiones
+_CODE_TEMPLATES = {
+    'flask_api': '''
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
@@ -39,7 +157,7 @@ CORS(app)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({'status': 'healthy', 'timestamp': now_iso()})
 
 @app.route('/api/data', methods=['GET', 'POST'])
 def handle_data():
@@ -52,7 +170,7 @@ def handle_data():
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 ''',
-            'react_component': '''
+    'react_component': '''
 import React, { useState, useEffect } from 'react';
 
 const MyComponent = () => {
@@ -89,7 +207,7 @@ const MyComponent = () => {
 
 export default MyComponent;
 ''',
-            'python_script': '''
+    'python_script': '''
 #!/usr/bin/env python3
 import os
 import sys
@@ -112,263 +230,534 @@ def main():
 if __name__ == '__main__':
     main()
 '''
+}
+
+# Respuestas JSON de las plantillas, serializadas una sola vez al importar
+_TEMPLATES_RESPONSE = orjson.dumps({'templates': list(_CODE_TEMPLATES), 'status': 'success'})
+_TEMPLATE_RESPONSES = {
+    template_type: orjson.dumps({'template': template, 'type': template_type, 'status': 'success'})
+    for template_type, template in _CODE_TEMPLATES.items()
+}
+
+# Tablas de búsqueda: se construyen una vez al importar el módulo
+SEARCH_INDICATORS = (
+    'busca', 'buscar', 'search', 'encuentra', 'información sobre',
+    'qué es', 'quién es', 'cuándo', 'dónde', 'cómo', 'por qué',
+    'últimas noticias', 'actualización', 'estado actual',
+    'precio de', 'cotización', 'valor actual',
+    'definición de', 'significado de'
+)
+# Búsquedas de poco valor que no compensan el viaje a DuckDuckGo: mensajes largos
+# (código pegado) o consultas con menos de dos palabras clave
+SEARCH_MAX_MESSAGE_LENGTH = 500
+SEARCH_MIN_KEYWORDS = 2
+SEARCH_MIN_QUERY_LENGTH = 6
+_SEARCH_INDICATORS_RE = re.compile('|'.join(map(re.escape, SEARCH_INDICATORS)))
+
+# Autómata Aho–Corasick: una sola pasada en C sobre el mensaje para todos los
+# indicadores; si pyahocorasick no está instalado se usa la expresión regular
+if ahocorasick is not None:
+    _SEARCH_AUTOMATON = ahocorasick.Automaton()
+    for indicator in SEARCH_INDICATORS:
+        _SEARCH_AUTOMATON.add_word(indicator, indicator)
+    _SEARCH_AUTOMATON.make_automaton()
+else:
+    _SEARCH_AUTOMATON = None
+
+_STOP_WORDS = frozenset({
+    'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da',
+    'su', 'por', 'son', 'con', 'para', 'como', 'está', 'tiene', 'del', 'al'
+})
+# Todo lo que no es palabra ni espacio se sustituye por un espacio
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+# Mensaje de sistema compartido por referencia: bytes idénticos en todas las llamadas
+# para que OpenAI reutilice el prefijo cacheado
+_SYSTEM_MSG = {"role": "system", "content": CHAT_SYSTEM_MESSAGE}
+
+# Tokenizador del modelo de chat; sin tiktoken (o sin poder cargar la codificación)
+# se estima a razón de ~4 caracteres por token
+try:
+    _ENC = tiktoken.encoding_for_model("gpt-3.5-turbo") if tiktoken else None
+except Exception:
+    _ENC = None
+
+def count_tokens(text: str) -> int:
+    """Número (o estimación) de tokens de un texto"""
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    return len(text) // 4 + 1
+
+# Presupuesto de tokens de entrada: deja margen para los 1500 de la respuesta
+INPUT_TOKEN_BUDGET = 3000
+_SYSTEM_TOKENS = count_tokens(CHAT_SYSTEM_MESSAGE)
+
+# Memoria de conversación: últimos turnos en crudo + resumen acumulado de los anteriores
+RECENT_MESSAGES = 4  # Últimos 2 turnos (usuario + asistente) enviados tal cual
+SUMMARY_BATCH = 4  # Mensajes fuera de la ventana que se acumulan antes de resumir
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_MAX_TOKENS = 100
+
+# Caché de búsquedas y respuestas repetidas (Redis con TTL o LRU en memoria)
+SEARCH_CACHE_TTL = 3600
+RESPONSE_CACHE_TTL = 3600
+
+# Historial: en Redis (compartido entre workers) o en un LRU acotado en memoria
+HISTORY_MAX_MESSAGES = 20
+HISTORY_MAX_SESSIONS = 5000
+HISTORY_TTL = 86400
+# Búsquedas recientes que se conservan en memoria por worker
+SEARCH_HISTORY_SIZE = 1000
+
+class SearchAPIError(Exception):
+    """La API de búsqueda respondió con un código distinto de 200"""
+    
+    def __init__(self, status_code: int):
+        super().__init__(f'Código de estado {status_code}')
+        self.status_code = status_code
+
+class EnhancedAIAssistant:
+    """Asistente de IA mejorado con capacidades de búsqueda en internet"""
+    
+    def __init__(self):
+        self.conversation_history = ConversationStore(
+            Config.REDIS_URL, max_messages=HISTORY_MAX_MESSAGES, ttl=HISTORY_TTL,
+            max_sessions=HISTORY_MAX_SESSIONS
+        )
+        self.search_history = deque(maxlen=SEARCH_HISTORY_SIZE)
+        self._memory_lock = threading.Lock()
+        self._summarizing = set()
+        
+        # Búsquedas y completions en curso por clave (single-flight)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.search_cache = ResponseCache(Config.REDIS_URL, prefix='search', ttl=SEARCH_CACHE_TTL, max_entries=4096)
+        self.response_cache = ResponseCache(Config.REDIS_URL, prefix='ai-enhanced', ttl=RESPONSE_CACHE_TTL,
+                                            max_entries=10000)
+
+        self.code_templates = _CODE_TEMPLATES
+    
+    def _fetch_search_results(self, query: str) -> List[Dict[str, Any]]:
+        """Consulta DuckDuckGo y extrae los resultados relevantes"""
+        # Usar DuckDuckGo API para búsquedas
+        params = {
+            'q': query,
+            'format': 'json',
+            'no_html': '1',
+            'skip_disambig': '1'
         }
+        
+        response = _http.get(SEARCH_URL, params=params)
+        if response.status_code != 200:
+            raise SearchAPIError(response.status_code)
+        
+        data = response.json()
+        
+        # Extraer información relevante
+        results = []
+        
+        # Abstract (resumen principal)
+        if data.get('Abstract'):
+            results.append({
+                'type': 'abstract',
+                'content': data['Abstract'],
+                'source': data.get('AbstractSource', 'DuckDuckGo')
+            })
+        
+        # Related topics
+        if data.get('RelatedTopics'):
+            for topic in data['RelatedTopics'][:3]:  # Limitar a 3 resultados
+                if isinstance(topic, dict) and topic.get('Text'):
+                    results.append({
+                        'type': 'related_topic',
+                        'content': topic['Text'],
+                        'url': topic.get('FirstURL', '')
+                    })
+        
+        # Answer (respuesta directa)
+        if data.get('Answer'):
+            results.append({
+                'type': 'answer',
+                'content': data['Answer'],
+                'source': data.get('AnswerType', 'calculation')
+            })
+        
+        return results
+    
+    def _single_flight(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Ejecuta `fn` una sola vez por clave; las llamadas concurrentes esperan su resultado
+
+        Devuelve (resultado, compartido).
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        
+        if not leader:
+            # Otra petición ya está en curso con la misma clave: se comparte su resultado
+            return future.result(), True
+        
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+    
+    def _single_flight_search(self, cache_key: str, query: str) -> tuple:
+        """Ejecuta una sola petición por consulta; las concurrentes esperan su resultado"""
+        def fetch():
+            results = self._fetch_search_results(query)
+            self.search_cache.set(cache_key, results)
+            return results
+        return self._single_flight(f'search:{cache_key}', fetch)
     
     def search_internet(self, query: str) -> Dict[str, Any]:
         """Realiza búsqueda en internet usando DuckDuckGo API"""
         try:
-            # Usar DuckDuckGo API para búsquedas
-            search_url = "https://api.duckduckgo.com/"
-            params = {
-                'q': query,
-                'format': 'json',
-                'no_html': '1',
-                'skip_disambig': '1'
+            # Las consultas equivalentes (mayúsculas, espacios) comparten entrada de caché
+            cache_key = hash_key(' '.join(query.lower().split()))
+            results = self.search_cache.get(cache_key)
+            cached = results is not None
+            if not cached:
+                results, cached = self._single_flight_search(cache_key, query)
+            
+            search_result = {
+                'query': query,
+                'results': results,
+                'cached': cached,
+                'timestamp': now_iso(),
+                'status': 'success'
             }
             
-            response = requests.get(search_url, params=params, timeout=10)
+            # Guardar en historial
+            self.search_history.append(search_result)
+            
+            return search_result
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extraer información relevante
-                results = []
-                
-                # Abstract (resumen principal)
-                if data.get('Abstract'):
-                    results.append({
-                        'type': 'abstract',
-                        'content': data['Abstract'],
-                        'source': data.get('AbstractSource', 'DuckDuckGo')
-                    })
-                
-                # Related topics
-                if data.get('RelatedTopics'):
-                    for topic in data['RelatedTopics'][:3]:  # Limitar a 3 resultados
-                        if isinstance(topic, dict) and topic.get('Text'):
-                            results.append({
-                                'type': 'related_topic',
-                                'content': topic['Text'],
-                                'url': topic.get('FirstURL', '')
-                            })
-                
-                # Answer (respuesta directa)
-                if data.get('Answer'):
-                    results.append({
-                        'type': 'answer',
-                        'content': data['Answer'],
-                        'source': data.get('AnswerType', 'calculation')
-                    })
-                
-                search_result = {
-                    'query': query,
-                    'results': results,
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'success'
-                }
-                
-                # Guardar en historial
-                self.search_history.append(search_result)
-                
-                return search_result
-            else:
-                return {
-                    'query': query,
-                    'error': f'Error en búsqueda: {response.status_code}',
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'error'
-                }
-                
+        # Los fallos de la API externa no son fatales: el chat continúa sin resultados
+        except SearchAPIError as e:
+            return {
+                'query': query,
+                'error': f'Error en búsqueda: {e.status_code}',
+                'timestamp': now_iso(),
+                'status': 'error'
+            }
         except Exception as e:
+            # Red, JSON inválido o una respuesta con forma inesperada
+            logger.warning("Error realizando búsqueda '%s': %s", query, e)
             return {
                 'query': query,
-                'error': f'Error realizando búsqueda: {str(e)}',
-                'timestamp': datetime.now().isoformat(),
+                'error': 'Error realizando búsqueda',
+                'timestamp': now_iso(),
                 'status': 'error'
             }
     
     def needs_internet_search(self, message: str) -> bool:
         """Determina si un mensaje requiere búsqueda en internet"""
-        search_indicators = [
-            'busca', 'buscar', 'search', 'encuentra', 'información sobre',
-            'qué es', 'quién es', 'cuándo', 'dónde', 'cómo', 'por qué',
-            'últimas noticias', 'actualización', 'estado actual',
-            'precio de', 'cotización', 'valor actual',
-            'definición de', 'significado de'
-        ]
-        
         message_lower = message.lower()
-        return any(indicator in message_lower for indicator in search_indicators)
+        if _SEARCH_AUTOMATON is not None:
+            for _ in _SEARCH_AUTOMATON.iter(message_lower):
+                return True
+            return False
+        return _SEARCH_INDICATORS_RE.search(message_lower) is not None
+    
+    def _prepare_chat(self, message: str, session_id: str) -> Dict[str, Any]:
+        """Reúne historial, memoria y búsqueda y construye los mensajes para OpenAI"""
+        # Obtener historial reciente y resumen de los turnos anteriores
+        history = self.conversation_history.get_messages(session_id, RECENT_MESSAGES)
+        memory = self.conversation_history.get_memory(session_id)
+        
+        # Determinar si necesita búsqueda en internet
+        search_query = None
+        search_results = None
+        if len(message) <= SEARCH_MAX_MESSAGE_LENGTH and self.needs_internet_search(message):
+            # Extraer términos de búsqueda del mensaje
+            search_query = self._extract_search_terms(message)
+            if len(search_query) < SEARCH_MIN_QUERY_LENGTH or len(search_query.split()) < SEARCH_MIN_KEYWORDS:
+                search_query = None
+            else:
+                search_results = self.search_internet(search_query)
+        
+        # Agregar información de búsqueda si está disponible
+        enhanced_message = message
+        if search_results and search_results.get('results'):
+            search_info = "\n\nInformación encontrada en internet:\n"
+            for result in search_results['results'][:3]:  # Limitar a 3 resultados
+                search_info += f"- {result['content']}\n"
+            enhanced_message = f"{message}\n{search_info}"
+        
+        # Preparar mensajes para OpenAI: el prefijo fijo va siempre primero
+        messages = [_SYSTEM_MSG]
+        budget = INPUT_TOKEN_BUDGET - _SYSTEM_TOKENS - count_tokens(enhanced_message)
+        
+        # Agregar resumen de turnos antiguos
+        context = []
+        if memory:
+            if memory['summary']:
+                summary_msg = {"role": "assistant", "content": f"Resumen de la conversación anterior: {memory['summary']}"}
+                messages.append(summary_msg)
+                budget -= count_tokens(summary_msg['content'])
+            context.extend(memory['pending'])
+        
+        # Mensajes aún no resumidos e historial reciente, del más nuevo al más antiguo,
+        # mientras quepan en el presupuesto (el historial guarda su recuento de tokens)
+        context.extend(history)
+        included = []
+        for msg in reversed(context):
+            tokens = msg.get('tokens') or count_tokens(msg['content'])
+            if tokens > budget:
+                break
+            budget -= tokens
+            included.append({"role": msg["role"], "content": msg["content"]})
+        messages.extend(reversed(included))
+        
+        # Agregar mensaje actual
+        messages.append({"role": "user", "content": enhanced_message})
+        
+        return {
+            'history': history,
+            'memory': memory,
+            'messages': messages,
+            'enhanced_message': enhanced_message,
+            'search_query': search_query,
+            'search_results': search_results
+        }
+    
+    def _search_fields(self, search_results: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Campos de la respuesta que describen la búsqueda realizada"""
+        if not search_results:
+            return {}
+        return {
+            'search_performed': True,
+            'search_query': search_results.get('query'),
+            'search_results_count': len(search_results.get('results', []))
+        }
     
     def get_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Obtiene respuesta de la IA con capacidades de búsqueda"""
+        chat = self._prepare_chat(message, session_id)
+        history, memory, messages = chat['history'], chat['memory'], chat['messages']
+        
+        # Respuesta cacheada solo si el prompt completo que se enviaría (sistema, resumen,
+        # historial incluido y búsqueda) es idéntico: no depende de otras sesiones
+        cache_key = hash_key(orjson.dumps(messages).decode('utf-8'))
+        ai_response = self.response_cache.get(cache_key)
+        cached = ai_response is not None
+        
+        # Llamar a OpenAI (los primeros turnos idénticos en curso comparten la llamada)
+        if not cached:
+            if not history and not memory:
+                ai_response = self._coalesced_completion(messages, 1500, 0.7)
+            else:
+                response = get_openai_client().chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    max_tokens=1500,
+                    temperature=0.7
+                )
+                ai_response = response.choices[0].message.content
+            self.response_cache.set(cache_key, ai_response)
+        
+        # Guardar en historial
+        self._save_turn(session_id, message, ai_response, history)
+        
+        result = {
+            'response': ai_response,
+            'session_id': session_id,
+            'cached': cached,
+            'timestamp': now_iso(),
+            'status': 'success'
+        }
+        
+        # Incluir información de búsqueda si se realizó
+        result.update(self._search_fields(chat['search_results']))
+        
+        return result
+    
+    def stream_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None):
+        """Obtiene respuesta de la IA en streaming como eventos SSE"""
         try:
-            # Obtener historial de conversación
-            if session_id not in self.conversation_history:
-                self.conversation_history[session_id] = []
-            
-            history = self.conversation_history[session_id]
-            
-            # Determinar si necesita búsqueda en internet
-            search_results = None
-            if self.needs_internet_search(message):
-                # Extraer términos de búsqueda del mensaje
-                search_query = self._extract_search_terms(message)
-                if search_query:
-                    search_results = self.search_internet(search_query)
+            chat = self._prepare_chat(message, session_id)
             
-            # Preparar mensajes para OpenAI
-            system_message = """Eres un asistente de IA especializado en programación y desarrollo de software con acceso a información actualizada de internet. 
-
-Puedes ayudar con:
-- Generación de código en Python, JavaScript, React, Flask
-- Explicación de conceptos de programación
-- Debugging y solución de problemas
-- Arquitectura de software
-- Mejores prácticas de desarrollo
-- Información actualizada sobre tecnologías y tendencias
-- Búsquedas y consultas de información en tiempo real
-
-Si tienes información de búsquedas de internet, úsala para proporcionar respuestas más precisas y actualizadas.
-
-Responde de manera clara, concisa y práctica. Si generas código, incluye comentarios explicativos."""
-
-            messages = [{"role": "system", "content": system_message}]
-            
-            # Agregar historial reciente (últimos 10 mensajes)
-            for msg in history[-10:]:
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            # Agregar información de búsqueda si está disponible
-            enhanced_message = message
-            if search_results and search_results.get('results'):
-                search_info = "\n\nInformación encontrada en internet:\n"
-                for result in search_results['results'][:3]:  # Limitar a 3 resultados
-                    search_info += f"- {result['content']}\n"
-                enhanced_message = f"{message}\n{search_info}"
-            
-            # Agregar mensaje actual
-            messages.append({"role": "user", "content": enhanced_message})
-            
-            # Llamar a OpenAI
+            # Llamar a OpenAI en modo streaming
             response = get_openai_client().chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=messages,
+                messages=chat['messages'],
                 max_tokens=1500,
-                temperature=0.7
+                temperature=0.7,
+                stream=True
             )
             
-            ai_response = response.choices[0].message.content
-            
-            # Guardar en historial
-            history.append({"role": "user", "content": message, "timestamp": datetime.now().isoformat()})
-            history.append({"role": "assistant", "content": ai_response, "timestamp": datetime.now().isoformat()})
+            # Reenviar cada fragmento al cliente a medida que llega
+            chunks = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield b"data: " + orjson.dumps({'delta': delta}) + b"\n\n"
             
-            # Mantener solo los últimos 20 mensajes
-            if len(history) > 20:
-                history = history[-20:]
+            # Guardar en historial una vez completada la respuesta
+            self._save_turn(session_id, message, ''.join(chunks), chat['history'])
             
-            self.conversation_history[session_id] = history
+            done = {'done': True, 'session_id': session_id, **self._search_fields(chat['search_results']),
+                    'timestamp': now_iso(), 'status': 'success'}
+            yield b"data: " + orjson.dumps(done) + b"\n\n"
             
-            result = {
-                'response': ai_response,
-                'session_id': session_id,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'success'
-            }
-            
-            # Incluir información de búsqueda si se realizó
-            if search_results:
-                result['search_performed'] = True
-                result['search_query'] = search_results.get('query')
-                result['search_results_count'] = len(search_results.get('results', []))
+        except Exception:
+            logger.exception("Error en el streaming de la sesión %s", session_id)
+            error = {'error': 'Error al obtener respuesta de IA', 'session_id': session_id,
+                     'timestamp': now_iso(), 'status': 'error'}
+            yield b"data: " + orjson.dumps(error) + b"\n\n"
+    
+    def _save_turn(self, session_id: str, message: str, ai_response: str, history: List[Dict[str, Any]]):
+        """Guarda el turno y pasa a la cola de resumen el turno que sale de la ventana reciente"""
+        # El almacenamiento conserva solo los últimos 20 mensajes
+        now = now_iso()
+        self.conversation_history.append_messages(session_id, [
+            {"role": "user", "content": message, "timestamp": now, "tokens": count_tokens(message)},
+            {"role": "assistant", "content": ai_response, "timestamp": now, "tokens": count_tokens(ai_response)}
+        ])
+        
+        if len(history) < RECENT_MESSAGES:
+            return
+        
+        with self._memory_lock:
+            memory = self.conversation_history.get_memory(session_id) or {'summary': '', 'pending': []}
+            for msg in history[:2]:
+                memory['pending'].append({"role": msg["role"], "content": msg["content"]})
             
-            return result
+            # Si el resumen falla repetidamente, la cola no crece sin límite (no se
+            # recorta con un resumen en curso: este retirará los que ya ha resumido)
+            in_progress = session_id in self._summarizing
+            if not in_progress:
+                memory['pending'] = memory['pending'][-SUMMARY_BATCH * 2:]
+            self.conversation_history.set_memory(session_id, memory)
             
-        except Exception as e:
-            return {
-                'error': f'Error al obtener respuesta de IA: {str(e)}',
-                'session_id': session_id,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'error'
-            }
+            summarize = len(memory['pending']) >= SUMMARY_BATCH and not in_progress
+            if summarize:
+                self._summarizing.add(session_id)
+        
+        # El resumen se regenera cada SUMMARY_BATCH mensajes, fuera del camino de la respuesta
+        if summarize:
+            threading.Thread(
+                target=self._update_summary,
+                # Copia: con el almacenamiento en memoria la lista sigue creciendo
+                args=(session_id, memory['summary'], list(memory['pending'])),
+                daemon=True
+            ).start()
+    
+    def _update_summary(self, session_id: str, summary: str, pending: List[Dict[str, str]]):
+        """Integra los mensajes pendientes en el resumen de la sesión con un modelo barato"""
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in pending)
+        try:
+            response = get_openai_client().chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": "Resume la conversación en español en menos de 100 palabras, conservando datos, decisiones y código relevantes."},
+                    {"role": "user", "content": f"Resumen previo:\n{summary or '(vacío)'}\n\nNuevos mensajes:\n{transcript}"}
+                ],
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.3
+            )
+            new_summary = response.choices[0].message.content
+        except Exception:
+            # Se reintentará con el siguiente lote de mensajes pendientes
+            with self._memory_lock:
+                self._summarizing.discard(session_id)
+            return
+        
+        with self._memory_lock:
+            self._summarizing.discard(session_id)
+            memory = self.conversation_history.get_memory(session_id) or {'summary': '', 'pending': []}
+            # Solo se retiran los mensajes resumidos; los llegados mientras tanto siguen pendientes
+            memory['summary'] = new_summary
+            memory['pending'] = memory['pending'][len(pending):]
+            self.conversation_history.set_memory(session_id, memory)
+    
+    def _coalesced_completion(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        """Completion sin estado; las peticiones concurrentes con el mismo prompt comparten la llamada
+
+        Solo se agrupan prompts idénticos: cada prompt distinto va en su propia llamada y
+        nunca comparte contexto con el de otro usuario.
+        """
+        key = hash_key('completion', str(max_tokens), str(temperature), orjson.dumps(messages).decode('utf-8'))
+        
+        def complete():
+            response = get_openai_client().chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            return response.choices[0].message.content
+        return self._single_flight(key, complete)[0]
     
     def _extract_search_terms(self, message: str) -> str:
         """Extrae términos de búsqueda del mensaje"""
-        # Remover palabras comunes y extraer términos clave
-        stop_words = {'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'como', 'está', 'tiene', 'del', 'al'}
-        
         # Limpiar el mensaje
-        clean_message = re.sub(r'[^\w\s]', ' ', message.lower())
-        words = clean_message.split()
+        words = _NON_WORD_RE.sub(' ', message.lower()).split()
         
         # Filtrar palabras de parada y palabras muy cortas
-        keywords = [word for word in words if word not in stop_words and len(word) > 2]
+        keywords = [word for word in words if word not in _STOP_WORDS and len(word) > 2]
         
         # Tomar las primeras 5 palabras clave
         return ' '.join(keywords[:5])
     
     def generate_code(self, description: str, language: str = 'python', framework: str = None) -> Dict[str, Any]:
         """Genera código basado en descripción con información actualizada"""
-        try:
-            # Verificar si necesita información actualizada sobre el framework
-            search_results = None
-            if framework:
-                search_query = f"{framework} {language} best practices latest"
-                search_results = self.search_internet(search_query)
-            
-            # Preparar prompt específico para generación de código
-            prompt = f"""
-            Genera código {language} {'usando ' + framework if framework else ''} para:
-            {description}
-            
-            Requisitos:
-            - Código limpio y bien comentado
-            - Manejo de errores apropiado
-            - Mejores prácticas del lenguaje y framework
-            - Funcional y listo para usar
-            - Usa las últimas versiones y mejores prácticas
-            
-            Proporciona solo el código sin explicaciones adicionales.
-            """
-            
-            # Agregar información de búsqueda si está disponible
-            if search_results and search_results.get('results'):
-                search_info = "\n\nInformación actualizada encontrada:\n"
-                for result in search_results['results'][:2]:
-                    search_info += f"- {result['content']}\n"
-                prompt += search_info
-            
-            response = get_openai_client().chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2000,
-                temperature=0.3
-            )
-            
-            generated_code = response.choices[0].message.content
-            
-            result = {
-                'code': generated_code,
-                'language': language,
-                'framework': framework,
-                'description': description,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'success'
-            }
-            
-            if search_results:
-                result['search_performed'] = True
-                result['search_query'] = search_results.get('query')
-            
-            return result
-            
-        except Exception as e:
-            return {
-                'error': f'Error generando código: {str(e)}',
-                'timestamp': datetime.now().isoformat(),
-                'status': 'error'
-            }
+        # Verificar si necesita información actualizada sobre el framework
+        search_results = None
+        if framework:
+            search_query = f"{framework} {language} best practices latest"
+            search_results = self.search_internet(search_query)
+        
+        # Preparar prompt específico para generación de código
+        prompt = f"""
+        Genera código {language} {'usando ' + framework if framework else ''} para:
+        {description}
+        
+        Requisitos:
+        - Código limpio y bien comentado
+        - Manejo de errores apropiado
+        - Mejores prácticas del lenguaje y framework
+        - Funcional y listo para usar
+        - Usa las últimas versiones y mejores prácticas
+        
+        Proporciona solo el código sin explicaciones adicionales.
+        """
+        
+        # Agregar información de búsqueda si está disponible
+        if search_results and search_results.get('results'):
+            search_info = "\n\nInformación actualizada encontrada:\n"
+            for result in search_results['results'][:2]:
+                search_info += f"- {result['content']}\n"
+            prompt += search_info
+        
+        generated_code = self._coalesced_completion([{"role": "user", "content": prompt}], 2000, 0.3)
+        
+        result = {
+            'code': generated_code,
+            'language': language,
+            'framework': framework,
+            'description': description,
+            'timestamp': now_iso(),
+            'status': 'success'
+        }
+        
+        if search_results:
+            result['search_performed'] = True
+            result['search_query'] = search_results.get('query')
+        
+        return result
     
     def get_code_template(self, template_type: str) -> Dict[str, Any]:
         """Obtiene plantilla de código predefinida"""
@@ -376,23 +765,23 @@ Responde de manera clara, concisa y práctica. Si generas código, incluye comen
             return {
                 'template': self.code_templates[template_type],
                 'type': template_type,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'success'
             }
         else:
             return {
                 'error': f'Plantilla {template_type} no encontrada',
                 'available_templates': list(self.code_templates.keys()),
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'error'
             }
     
     def get_search_history(self) -> Dict[str, Any]:
         """Obtiene el historial de búsquedas"""
         return {
-            'searches': self.search_history[-10:],  # Últimas 10 búsquedas
+            'searches': list(self.search_history)[-10:],  # Últimas 10 búsquedas
             'total_searches': len(self.search_history),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'status': 'success'
         }
 
@@ -401,110 +790,105 @@ ai_assistant = EnhancedAIAssistant()
 
 @ai_assistant_bp.route("/chat", methods=["POST"])
 @cross_origin()
+@json_endpoint
 def chat():
     """Endpoint para chatear con el asistente de IA"""
-    try:
-        data = request.get_json()
-        message = data.get('message', '')
-        session_id = data.get('session_id', f'session_{int(time.time())}')
-        context = data.get('context', {})
-        
-        if not message:
-            return jsonify({"error": "Mensaje requerido"}), 400
-        
-        response = ai_assistant.get_ai_response(message, session_id, context)
-        return jsonify(response), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    data = request.get_json()
+    message = data.get('message', '')
+    session_id = data.get('session_id', f'session_{int(time.time())}')
+    context = data.get('context', {})
+    
+    if not message:
+        return {"error": "Mensaje requerido"}, 400
+    
+    return ai_assistant.get_ai_response(message, session_id, context)
+
+@ai_assistant_bp.route("/chat/stream", methods=["POST"])
+@cross_origin()
+@json_endpoint
+def chat_stream():
+    """Endpoint para chatear con el asistente recibiendo la respuesta en streaming (SSE)"""
+    data = request.get_json()
+    message = data.get('message', '')
+    session_id = data.get('session_id', f'session_{int(time.time())}')
+    context = data.get('context', {})
+    
+    if not message:
+        return {"error": "Mensaje requerido"}, 400
+    
+    return Response(
+        stream_with_context(ai_assistant.stream_ai_response(message, session_id, context)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @ai_assistant_bp.route("/generate-code", methods=["POST"])
 @cross_origin()
+@json_endpoint
 def generate_code():
     """Endpoint para generar código"""
-    try:
-        data = request.get_json()
-        description = data.get('description', '')
-        language = data.get('language', 'python')
-        framework = data.get('framework')
-        
-        if not description:
-            return jsonify({"error": "Descripción requerida"}), 400
-        
-        response = ai_assistant.generate_code(description, language, framework)
-        return jsonify(response), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    data = request.get_json()
+    description = data.get('description', '')
+    language = data.get('language', 'python')
+    framework = data.get('framework')
+    
+    if not description:
+        return {"error": "Descripción requerida"}, 400
+    
+    return ai_assistant.generate_code(description, language, framework)
 
 @ai_assistant_bp.route("/search", methods=["POST"])
 @cross_origin()
+@json_endpoint
 def search_internet():
     """Endpoint para realizar búsquedas en internet"""
-    try:
-        data = request.get_json()
-        query = data.get('query', '')
-        
-        if not query:
-            return jsonify({"error": "Consulta de búsqueda requerida"}), 400
-        
-        response = ai_assistant.search_internet(query)
-        return jsonify(response), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    data = request.get_json()
+    query = data.get('query', '')
+    
+    if not query:
+        return {"error": "Consulta de búsqueda requerida"}, 400
+    
+    return ai_assistant.search_internet(query)
 
 @ai_assistant_bp.route("/search-history", methods=["GET"])
 @cross_origin()
+@json_endpoint
 def get_search_history():
     """Endpoint para obtener historial de búsquedas"""
-    try:
-        response = ai_assistant.get_search_history()
-        return jsonify(response), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    return ai_assistant.get_search_history()
 
 @ai_assistant_bp.route("/templates", methods=["GET"])
 @cross_origin()
+@json_endpoint
 def get_templates():
     """Endpoint para obtener plantillas disponibles"""
-    try:
-        templates = list(ai_assistant.code_templates.keys())
-        return jsonify({
-            'templates': templates,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    return json_response(_TEMPLATES_RESPONSE)
 
 @ai_assistant_bp.route("/template/<template_type>", methods=["GET"])
 @cross_origin()
+@json_endpoint
 def get_template(template_type):
     """Endpoint para obtener una plantilla específica"""
-    try:
-        response = ai_assistant.get_code_template(template_type)
-        return jsonify(response), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    if template_type in _TEMPLATE_RESPONSES:
+        return json_response(_TEMPLATE_RESPONSES[template_type])
+    
+    return ai_assistant.get_code_template(template_type)
 
 @ai_assistant_bp.route("/conversation/<session_id>", methods=["GET"])
 @cross_origin()
+@json_endpoint
 def get_conversation(session_id):
     """Endpoint para obtener historial de conversación"""
-    try:
-        history = ai_assistant.conversation_history.get(session_id, [])
-        return jsonify({
-            'session_id': session_id,
-            'history': history,
-            'message_count': len(history),
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
-        
-    except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+    # El recuento de tokens que se guarda con cada mensaje es interno
+    history = [
+        {key: value for key, value in msg.items() if key != 'tokens'}
+        for msg in ai_assistant.conversation_history.get_messages(session_id)
+    ]
+    return {
+        'session_id': session_id,
+        'history': history,
+        'message_count': len(history),
+        'timestamp': now_iso(),
+        'status': 'success'
+    }
 
@@ -1,17 +1,62 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_cors import cross_origin
-import json
+import orjson
 import time
-from datetime import datetime
+import hashlib
+import threading
+import re
+import os
+import sys
+import itertools
+from functools import lru_cache
+from collections import OrderedDict, deque
 from typing import Dict, List, Any, Optional
+from src.utils.clock import now_iso
+from src.utils.json_provider import json_response
 
 ai_assistant_bp = Blueprint("ai_assistant", __name__)
 
+# Mensajes conservados por sesión
+HISTORY_MAX_MESSAGES = 20
+# Respuestas y código memoizados para mensajes/descripciones repetidos
+DISPATCH_CACHE_SIZE = 512
+# Particiones del historial, cada una con su lock (potencia de dos)
+HISTORY_SHARDS = 16
+# Límites del historial en memoria: sesiones inactivas más de una hora se descartan
+HISTORY_MAX_SESSIONS = 10_000
+HISTORY_IDLE_TTL = 3600
+# Las plantillas no cambian durante la vida del proceso: los clientes pueden cachearlas
+STATIC_MAX_AGE = 3600
+
+# Palabras clave del chat, en orden de prioridad. Se buscan como subcadenas para que
+# también cuenten las formas flexionadas ("componentes", "servidores", "apis")
+_CHAT_KEYWORDS = (
+    ('primos', ('primo', 'primos', 'prime')),
+    ('flask', ('flask', 'api', 'servidor')),
+    ('react', ('react', 'componente', 'frontend')),
+    ('default', ('hola', 'ayuda', 'help')),
+)
+_CHAT_KEYWORDS_RE = tuple((response, re.compile('|'.join(words))) for response, words in _CHAT_KEYWORDS)
+# Generación de código: palabra clave -> plantilla, en orden de prioridad. Una sola
+# pasada de la regex encuentra todas las palabras presentes en la descripción
+_CODE_KEYWORDS = {
+    'primo': 'python_function',
+    'flask': 'flask_api',
+    'api': 'flask_api',
+    'react': 'react_component',
+    'componente': 'react_component'
+}
+_CODE_KEYWORDS_RE = re.compile('|'.join(_CODE_KEYWORDS))
+
 class SimpleAIAssistant:
     """Asistente de IA simplificado sin dependencias externas"""
     
     def __init__(self):
-        self.conversation_history = {}
+        # Historial repartido en particiones por sesión: las actualizaciones de un turno
+        # son atómicas y las sesiones de distintas particiones no compiten por el lock
+        # Cada partición es un LRU ordenado por último acceso
+        self._history_shards = [OrderedDict() for _ in range(HISTORY_SHARDS)]
+        self._history_locks = [threading.Lock() for _ in range(HISTORY_SHARDS)]
         self.code_templates = {
             'flask_api': '''
 from flask import Flask, jsonify, request
@@ -22,7 +67,7 @@ CORS(app)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({'status': 'healthy', 'timestamp': now_iso()})
 
 @app.route('/api/data', methods=['GET', 'POST'])
 def handle_data():
@@ -86,18 +131,18 @@ def calcular_numeros_primos(limite):
     if limite < 2:
         return []
     
-    # Crear una lista de números booleanos
-    es_primo = [True] * (limite + 1)
-    es_primo[0] = es_primo[1] = False
+    # Un byte por número (1 = primo): más compacto que una lista de booleanos
+    es_primo = bytearray([1]) * (limite + 1)
+    es_primo[0] = es_primo[1] = 0
     
-    # Aplicar la Criba de Eratóstenes
+    # Aplicar la Criba de Eratóstenes: cada múltiplo se tacha con una sola
+    # asignación por slice, sin bucle interno en Python
     for i in range(2, int(limite**0.5) + 1):
         if es_primo[i]:
-            for j in range(i*i, limite + 1, i):
-                es_primo[j] = False
+            es_primo[i*i::i] = bytes(len(range(i*i, limite + 1, i)))
     
     # Recopilar los números primos
-    primos = [i for i in range(2, limite + 1) if es_primo[i]]
+    primos = [i for i, primo in enumerate(es_primo) if primo]
     return primos
 
 # Ejemplo de uso
@@ -125,18 +170,18 @@ def calcular_numeros_primos(limite):
     if limite < 2:
         return []
     
-    # Crear una lista de números booleanos
-    es_primo = [True] * (limite + 1)
-    es_primo[0] = es_primo[1] = False
+    # Un byte por número (1 = primo): más compacto que una lista de booleanos
+    es_primo = bytearray([1]) * (limite + 1)
+    es_primo[0] = es_primo[1] = 0
     
-    # Aplicar la Criba de Eratóstenes
+    # Aplicar la Criba de Eratóstenes: cada múltiplo se tacha con una sola
+    # asignación por slice, sin bucle interno en Python
     for i in range(2, int(limite**0.5) + 1):
         if es_primo[i]:
-            for j in range(i*i, limite + 1, i):
-                es_primo[j] = False
+            es_primo[i*i::i] = bytes(len(range(i*i, limite + 1, i)))
     
     # Recopilar los números primos
-    primos = [i for i in range(2, limite + 1) if es_primo[i]]
+    primos = [i for i, primo in enumerate(es_primo) if primo]
     return primos
 
 # Ejemplo de uso
@@ -161,69 +206,14 @@ Esta función es muy eficiente para encontrar todos los números primos hasta un
 
 ¿En qué puedo ayudarte hoy?'''
         }
-    
-    def get_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Obtiene respuesta simulada de la IA"""
-        try:
-            # Obtener historial de conversación
-            if session_id not in self.conversation_history:
-                self.conversation_history[session_id] = []
-            
-            history = self.conversation_history[session_id]
-            
-            # Generar respuesta basada en palabras clave
-            message_lower = message.lower()
-            
-            if any(word in message_lower for word in ['primo', 'primos', 'prime']):
-                ai_response = self.responses['primos']
-            elif any(word in message_lower for word in ['flask', 'api', 'servidor']):
-                ai_response = f"Te ayudo con Flask. Aquí tienes un ejemplo básico:\n\n```python\n{self.code_templates['flask_api']}\n```"
-            elif any(word in message_lower for word in ['react', 'componente', 'frontend']):
-                ai_response = f"Te ayudo con React. Aquí tienes un componente de ejemplo:\n\n```jsx\n{self.code_templates['react_component']}\n```"
-            elif any(word in message_lower for word in ['hola', 'ayuda', 'help']):
-                ai_response = self.responses['default']
-            else:
-                ai_response = f"Entiendo que preguntas sobre: '{message}'. Como asistente de IA especializado en programación, puedo ayudarte con desarrollo de software, algoritmos, y arquitecturas. ¿Podrías ser más específico sobre qué tipo de código o concepto necesitas?"
-            
-            # Guardar en historial
-            history.append({"role": "user", "content": message, "timestamp": datetime.now().isoformat()})
-            history.append({"role": "assistant", "content": ai_response, "timestamp": datetime.now().isoformat()})
-            
-            # Mantener solo los últimos 20 mensajes
-            if len(history) > 20:
-                history = history[-20:]
-            
-            self.conversation_history[session_id] = history
-            
-            return {
-                'response': ai_response,
-                'session_id': session_id,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'success'
-            }
-            
-        except Exception as e:
-            return {
-                'error': f'Error al obtener respuesta de IA: {str(e)}',
-                'session_id': session_id,
-                'timestamp': datetime.now().isoformat(),
-                'status': 'error'
-            }
-    
-    def generate_code(self, description: str, language: str = 'python', framework: str = None) -> Dict[str, Any]:
-        """Genera código basado en descripción"""
-        try:
-            description_lower = description.lower()
-            
-            # Generar código basado en descripción
-            if 'primo' in description_lower:
-                generated_code = self.code_templates['python_function']
-            elif 'flask' in description_lower or 'api' in description_lower:
-                generated_code = self.code_templates['flask_api']
-            elif 'react' in description_lower or 'componente' in description_lower:
-                generated_code = self.code_templates['react_component']
-            elif language == 'python':
-                generated_code = f'''# Código Python generado para: {description}
+        # Respuestas con plantilla: se componen una sola vez, las plantillas no cambian
+        self.responses['flask'] = "Te ayudo con Flask. Aquí tienes un ejemplo básico:\n\n```python\n" + self.code_templates['flask_api'] + "\n```"
+        self.responses['react'] = "Te ayudo con React. Aquí tienes un componente de ejemplo:\n\n```jsx\n" + self.code_templates['react_component'] + "\n```"
+        
+        # Código por defecto según lenguaje, partido alrededor de la descripción para
+        # unirlo con un único join en lugar de reconstruir el f-string en cada petición
+        self.language_defaults = {
+            'python': ('# Código Python generado para: ', '''
 
 def main():
     """Función principal"""
@@ -233,51 +223,202 @@ def main():
     # Ejemplo de procesamiento
     datos = [1, 2, 3, 4, 5]
     resultado = [x * 2 for x in datos]
-    print(f"Resultado: {{resultado}}")
+    print(f"Resultado: {resultado}")
 
 if __name__ == "__main__":
     main()
-'''
-            elif language == 'javascript':
-                generated_code = f'''// Código JavaScript generado para: {description}
+'''),
+            'javascript': ('// Código JavaScript generado para: ', '''
 
-function main() {{
+function main() {
     console.log("Hola, mundo!");
     
     // Ejemplo de procesamiento
     const datos = [1, 2, 3, 4, 5];
     const resultado = datos.map(x => x * 2);
     console.log("Resultado:", resultado);
-}}
+}
 
 main();
-'''
-            else:
-                generated_code = f'''// Código {language} generado para: {description}
+''')
+        }
+        self.generic_default_suffix = '''
 // Implementa aquí tu lógica específica
 
 #include <iostream>
 using namespace std;
 
-int main() {{
+int main() {
     cout << "Hola, mundo!" << endl;
     return 0;
-}}
+}
 '''
+        
+        # Las respuestas dependen solo del texto de entrada: se memoizan por instancia
+        self._dispatch_response = lru_cache(maxsize=DISPATCH_CACHE_SIZE)(self._build_response)
+        self._generate_code_body = lru_cache(maxsize=DISPATCH_CACHE_SIZE)(self._build_code)
+        
+        # Cuerpos JSON precalculados: el contenido es estático durante la vida del proceso
+        self._templates_json = orjson.dumps({'templates': list(self.code_templates), 'status': 'success'})
+        self._template_json = {
+            template_type: orjson.dumps({'template': template, 'type': template_type, 'status': 'success'})
+            for template_type, template in self.code_templates.items()
+        }
+        self._templates_etag = hashlib.md5(self._templates_json).hexdigest()
+        self._template_etags = {
+            template_type: hashlib.md5(body).hexdigest() for template_type, body in self._template_json.items()
+        }
+        # Respuestas fijas del chat y plantillas ya escapadas como cadena JSON, listas para insertar
+        self._response_json = {text: orjson.dumps(text) for text in self.responses.values()}
+        self._code_json = {code: orjson.dumps(code) for code in self.code_templates.values()}
+    
+    # Las respuestas correctas tienen un esquema fijo: se codifican campo a campo sobre
+    # fragmentos constantes, sin recorrer el dict, y el texto fijo ya va escapado
+    
+    def chat_response_body(self, response: Dict[str, Any]) -> Optional[bytes]:
+        """Serializa una respuesta de chat correcta (None si es un error)"""
+        if response.get('status') != 'success':
+            return None
+        text = response['response']
+        return b''.join((
+            b'{"response":', self._response_json.get(text) or orjson.dumps(text),
+            b',"session_id":', orjson.dumps(response['session_id']),
+            b',"timestamp":', orjson.dumps(response['timestamp']),
+            b',"status":"success"}'
+        ))
+    
+    def code_response_body(self, response: Dict[str, Any]) -> Optional[bytes]:
+        """Serializa una respuesta de generación de código correcta (None si es un error)"""
+        if response.get('status') != 'success':
+            return None
+        code = response['code']
+        return b''.join((
+            b'{"code":', self._code_json.get(code) or orjson.dumps(code),
+            b',"language":', orjson.dumps(response['language']),
+            b',"framework":', orjson.dumps(response['framework']),
+            b',"description":', orjson.dumps(response['description']),
+            b',"timestamp":', orjson.dumps(response['timestamp']),
+            b',"status":"success"}'
+        ))
+    
+    def _history_shard(self, session_id: str):
+        """Lock y partición del historial que corresponden a una sesión"""
+        index = hash(session_id) & (HISTORY_SHARDS - 1)
+        return self._history_locks[index], self._history_shards[index]
+    
+    def _session_messages(self, shard: OrderedDict, session_id: str, create: bool = False) -> Optional[deque]:
+        """Mensajes de una sesión (creándola si se pide) y limpieza de las inactivas o sobrantes
+
+        Debe llamarse con el lock de la partición adquirido.
+        """
+        now = time.time()
+        session = shard.get(session_id)
+        if session is not None and session['accessed_at'] + HISTORY_IDLE_TTL < now:
+            del shard[session_id]
+            session = None
+        
+        if session is None:
+            if not create:
+                return None
+            session = shard[session_id] = {'messages': deque(maxlen=HISTORY_MAX_MESSAGES)}
+        session['accessed_at'] = now
+        shard.move_to_end(session_id)
+        
+        # Las sesiones más antiguas quedan al principio de la partición
+        max_sessions = HISTORY_MAX_SESSIONS // HISTORY_SHARDS
+        while len(shard) > 1:
+            oldest_id, oldest = next(iter(shard.items()))
+            if len(shard) <= max_sessions and oldest['accessed_at'] + HISTORY_IDLE_TTL >= now:
+                break
+            del shard[oldest_id]
+        return session['messages']
+    
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Copia del historial de una sesión"""
+        lock, shard = self._history_shard(session_id)
+        with lock:
+            return list(self._session_messages(shard, session_id) or ())
+    
+    def _build_response(self, message: str) -> str:
+        """Texto de la respuesta para un mensaje, según sus palabras clave"""
+        message_lower = message.lower()
+        
+        for response, keywords_re in _CHAT_KEYWORDS_RE:
+            if keywords_re.search(message_lower):
+                ai_response = self.responses[response]
+                break
+        else:
+            ai_response = f"Entiendo que preguntas sobre: '{message}'. Como asistente de IA especializado en programación, puedo ayudarte con desarrollo de software, algoritmos, y arquitecturas. ¿Podrías ser más específico sobre qué tipo de código o concepto necesitas?"
+        
+        return ai_response
+    
+    def _build_code(self, description: str, language: str) -> str:
+        """Código para una descripción: plantilla por palabra clave o ejemplo por lenguaje"""
+        found = set(_CODE_KEYWORDS_RE.findall(description.lower()))
+        template_type = next((template for keyword, template in _CODE_KEYWORDS.items() if keyword in found), None)
+        
+        # Generar código basado en descripción
+        if template_type:
+            generated_code = self.code_templates[template_type]
+        elif language in self.language_defaults:
+            prefix, suffix = self.language_defaults[language]
+            generated_code = ''.join((prefix, description, suffix))
+        else:
+            generated_code = ''.join(('// Código ', language, ' generado para: ', description, self.generic_default_suffix))
+        
+        return generated_code
+    
+    def get_ai_response(self, message: str, session_id: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Obtiene respuesta simulada de la IA"""
+        try:
+            # Las sesiones se repiten en cada turno: una sola copia de la cadena (y de su hash)
+            if isinstance(session_id, str):
+                session_id = sys.intern(session_id)
+            ai_response = self._dispatch_response(message)
+            
+            # Guardar en historial (una sola marca de tiempo para todo el turno)
+            now = now_iso()
+            lock, shard = self._history_shard(session_id)
+            with lock:
+                history = self._session_messages(shard, session_id, create=True)
+                history.append({"role": "user", "content": message, "timestamp": now})
+                history.append({"role": "assistant", "content": ai_response, "timestamp": now})
+            
+            return {
+                'response': ai_response,
+                'session_id': session_id,
+                'timestamp': now,
+                'status': 'success'
+            }
+            
+        except Exception as e:
+            return {
+                'error': f'Error al obtener respuesta de IA: {str(e)}',
+                'session_id': session_id,
+                'timestamp': now_iso(),
+                'status': 'error'
+            }
+    
+    def generate_code(self, description: str, language: str = 'python', framework: str = None) -> Dict[str, Any]:
+        """Genera código basado en descripción"""
+        try:
+            # El framework no influye en el código simulado: no forma parte de la clave
+            language = sys.intern(str(language))
+            generated_code = self._generate_code_body(description, language)
             
             return {
                 'code': generated_code,
                 'language': language,
                 'framework': framework,
                 'description': description,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'success'
             }
             
         except Exception as e:
             return {
                 'error': f'Error generando código: {str(e)}',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'error'
             }
     
@@ -287,20 +428,47 @@ int main() {{
             return {
                 'template': self.code_templates[template_type],
                 'type': template_type,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'success'
             }
         else:
             return {
                 'error': f'Plantilla {template_type} no encontrada',
                 'available_templates': list(self.code_templates.keys()),
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now_iso(),
                 'status': 'error'
             }
 
 # Instancia global del asistente
 ai_assistant = SimpleAIAssistant()
 
+# Identificadores de sesión por defecto: únicos aunque lleguen varias peticiones en el
+# mismo segundo; el pid los distingue entre workers que heredan el contador (--preload)
+_session_ids = itertools.count(int(time.time() * 1000))
+
+# Cuerpos de error precalculados. Se crea un Response nuevo en cada petición porque
+# los hooks posteriores (CORS) modifican las cabeceras del objeto devuelto
+_ERR_MESSAGE_REQUIRED = orjson.dumps({"error": "Mensaje requerido"})
+_ERR_DESCRIPTION_REQUIRED = orjson.dumps({"error": "Descripción requerida"})
+_ERR_INTERNAL_PREFIX = b'{"error":"Error interno: '
+
+def _internal_error(e: Exception) -> Response:
+    """Respuesta 500 con el mensaje de la excepción tras el prefijo ya codificado"""
+    # orjson.dumps(str) devuelve la cadena entre comillas: se reutiliza la de cierre
+    body = b''.join((_ERR_INTERNAL_PREFIX, orjson.dumps(str(e))[1:], b'}'))
+    return json_response(body, 500)
+
+def _static_json_response(body: bytes, etag: str) -> Response:
+    """Respuesta JSON inmutable con ETag fuerte; responde 304 si el cliente ya la tiene"""
+    response = json_response(body, 200)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    return response.make_conditional(request)
+
+# Las vistas son síncronas a propósito: con workers gevent (ver wsgi.py) cualquier E/S
+# bloqueante que se añada (Redis, base de datos) ya cede el control a otras peticiones,
+# mientras que `async def` en Flask abriría un event loop nuevo por petición
 @ai_assistant_bp.route("/chat", methods=["POST"])
 @cross_origin()
 def chat():
@@ -308,17 +476,20 @@ def chat():
     try:
         data = request.get_json()
         message = data.get('message', '')
-        session_id = data.get('session_id', f'session_{int(time.time())}')
+        session_id = data.get('session_id') or f'session_{next(_session_ids)}_{os.getpid()}'
         context = data.get('context', {})
         
         if not message:
-            return jsonify({"error": "Mensaje requerido"}), 400
+            return json_response(_ERR_MESSAGE_REQUIRED, 400)
         
         response = ai_assistant.get_ai_response(message, session_id, context)
+        body = ai_assistant.chat_response_body(response)
+        if body is not None:
+            return json_response(body, 200)
         return jsonify(response), 200
         
     except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+        return _internal_error(e)
 
 @ai_assistant_bp.route("/generate-code", methods=["POST"])
 @cross_origin()
@@ -331,54 +502,55 @@ def generate_code():
         framework = data.get('framework')
         
         if not description:
-            return jsonify({"error": "Descripción requerida"}), 400
+            return json_response(_ERR_DESCRIPTION_REQUIRED, 400)
         
         response = ai_assistant.generate_code(description, language, framework)
+        body = ai_assistant.code_response_body(response)
+        if body is not None:
+            return json_response(body, 200)
         return jsonify(response), 200
         
     except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+        return _internal_error(e)
 
 @ai_assistant_bp.route("/templates", methods=["GET"])
 @cross_origin()
 def get_templates():
     """Endpoint para obtener plantillas disponibles"""
     try:
-        templates = list(ai_assistant.code_templates.keys())
-        return jsonify({
-            'templates': templates,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
+        return _static_json_response(ai_assistant._templates_json, ai_assistant._templates_etag)
         
     except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+        return _internal_error(e)
 
 @ai_assistant_bp.route("/template/<template_type>", methods=["GET"])
 @cross_origin()
 def get_template(template_type):
     """Endpoint para obtener una plantilla específica"""
     try:
+        if template_type in ai_assistant._template_json:
+            return _static_json_response(ai_assistant._template_json[template_type],
+                                         ai_assistant._template_etags[template_type])
         response = ai_assistant.get_code_template(template_type)
         return jsonify(response), 200
         
     except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+        return _internal_error(e)
 
 @ai_assistant_bp.route("/conversation/<session_id>", methods=["GET"])
 @cross_origin()
 def get_conversation(session_id):
     """Endpoint para obtener historial de conversación"""
     try:
-        history = ai_assistant.conversation_history.get(session_id, [])
+        history = ai_assistant.get_history(session_id)
         return jsonify({
             'session_id': session_id,
             'history': history,
             'message_count': len(history),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'status': 'success'
         }), 200
         
     except Exception as e:
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+        return _internal_error(e)
 
@@ -1,12 +1,176 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, jsonify, request
 from flask_cors import cross_origin
-import json
+import copy
+import hashlib
+import orjson
 import time
 import os
+import re
+import logging
+import threading
+import uuid
 import subprocess
 import yaml
+
+try:
+    # Emisor en C de libyaml; PyYAML sin libyaml solo tiene el emisor en Python
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Dict, List, Any, Optional
+from src.utils.json_provider import json_response, orjson_default
+
+# Indicadores de base de datos en las dependencias y directorios de archivos estáticos
+_DB_RE = re.compile(r'sqlite|postgresql|mysql|mongodb|database', re.IGNORECASE)
+_STATIC_DIRS = frozenset(('static', 'public', 'assets', 'dist', 'build'))
+
+# Análisis recientes cacheados por ruta y fecha de modificación
+ANALYSIS_CACHE_SIZE = 128
+# Archivos cuyo contenido afecta al análisis; editarlos no cambia el mtime del directorio
+ANALYSIS_MANIFESTS = ('requirements.txt', 'package.json')
+
+# Manifiestos de Kubernetes distintos que se conservan ya serializados
+KUBERNETES_CACHE_SIZE = 256
+DOCKER_CACHE_SIZE = 128
+# Despliegues que se conservan en memoria para /deployment-history
+DEPLOYMENT_HISTORY_SIZE = 1000
+# Hilos que ejecutan los despliegues fuera del hilo de la petición
+DEPLOY_WORKERS = 8
+# Segundos que clientes y proxies pueden reutilizar el catálogo de estrategias
+STRATEGIES_MAX_AGE = 3600
+
+# Plantillas de Dockerfile por framework; el puerto se rellena con str.format
+DOCKERFILE_TEMPLATES = {
+    'flask': """FROM python:3.11-slim
+
+WORKDIR /app
+
+COPY requirements.txt .
+RUN pip install --no-cache-dir -r requirements.txt
+
+COPY . .
+
+EXPOSE {port}
+
+CMD ["python", "app.py"]""",
+    'nodejs': """FROM node:18-alpine
+
+WORKDIR /app
+
+COPY package*.json ./
+RUN npm install
+
+COPY . .
+
+EXPOSE {port}
+
+CMD ["npm", "start"]""",
+    'static': """FROM nginx:alpine
+
+COPY . /usr/share/nginx/html
+
+EXPOSE 80
+
+CMD ["nginx", "-g", "daemon off;"]"""
+}
+
+def _freeze(value: Any) -> Any:
+    """Convierte dicts y listas anidados en MappingProxyType y tuplas de solo lectura"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+DEPLOYMENT_STRATEGIES = _freeze({
+    'simple': {
+        'description': 'Despliegue simple para aplicaciones pequeñas',
+        'complexity': 'low',
+        'downtime': 'minimal',
+        'rollback_time': 'fast',
+        'use_cases': ['desarrollo', 'prototipado', 'aplicaciones simples']
+    },
+    'blue_green': {
+        'description': 'Despliegue con dos entornos idénticos',
+        'complexity': 'medium',
+        'downtime': 'zero',
+        'rollback_time': 'instant',
+        'use_cases': ['producción', 'alta disponibilidad', 'aplicaciones críticas']
+    },
+    'canary': {
+        'description': 'Despliegue gradual a un subconjunto de usuarios',
+        'complexity': 'high',
+        'downtime': 'zero',
+        'rollback_time': 'fast',
+        'use_cases': ['aplicaciones de alto tráfico', 'testing en producción']
+    },
+    'rolling': {
+        'description': 'Actualización gradual de instancias',
+        'complexity': 'medium',
+        'downtime': 'minimal',
+        'rollback_time': 'medium',
+        'use_cases': ['microservicios', 'aplicaciones distribuidas']
+    }
+})
+
+CLOUD_PROVIDERS = _freeze({
+    'local': {
+        'description': 'Despliegue local para desarrollo',
+        'cost': 'free',
+        'scalability': 'limited',
+        'availability': 'low'
+    },
+    'docker': {
+        'description': 'Contenedorización con Docker',
+        'cost': 'low',
+        'scalability': 'medium',
+        'availability': 'medium'
+    },
+    'kubernetes': {
+        'description': 'Orquestación con Kubernetes',
+        'cost': 'medium',
+        'scalability': 'high',
+        'availability': 'high'
+    }
+})
+
+APPLICATION_TYPES = _freeze({
+    'web_app': {
+        'frameworks': ['flask', 'django', 'fastapi', 'express'],
+        'requirements': ['web_server', 'database', 'static_files'],
+        'recommended_strategy': 'blue_green'
+    },
+    'api': {
+        'frameworks': ['flask', 'fastapi', 'express'],
+        'requirements': ['web_server', 'database'],
+        'recommended_strategy': 'rolling'
+    },
+    'microservice': {
+        'frameworks': ['flask', 'fastapi', 'express'],
+        'requirements': ['container', 'service_discovery', 'load_balancer'],
+        'recommended_strategy': 'canary'
+    },
+    'static_site': {
+        'frameworks': ['react', 'vue', 'angular', 'html'],
+        'requirements': ['web_server', 'cdn'],
+        'recommended_strategy': 'simple'
+    }
+})
+
+# Puntuación de confianza de las recomendaciones
+CONFIDENCE_BASE = 0.5
+CONFIDENCE_STEP = 0.1
+_FIT_BY_COMPLEXITY = frozenset((('simple', 'low'), ('rolling', 'low')))
+_FIT_BY_AVAILABILITY = frozenset((('blue_green', 'high'), ('canary', 'high')))
+
+logger = logging.getLogger(__name__)
+
+_DEPLOY_POOL = ThreadPoolExecutor(max_workers=DEPLOY_WORKERS, thread_name_prefix='deploy')
 
 autonomous_deploy_bp = Blueprint('autonomous_deploy', __name__)
 
@@ -14,84 +178,51 @@ class DeploymentPlanner:
     """Planificador inteligente de despliegues"""
     
     def __init__(self):
-        self.deployment_strategies = {
-            'simple': {
-                'description': 'Despliegue simple para aplicaciones pequeñas',
-                'complexity': 'low',
-                'downtime': 'minimal',
-                'rollback_time': 'fast',
-                'use_cases': ['desarrollo', 'prototipado', 'aplicaciones simples']
-            },
-            'blue_green': {
-                'description': 'Despliegue con dos entornos idénticos',
-                'complexity': 'medium',
-                'downtime': 'zero',
-                'rollback_time': 'instant',
-                'use_cases': ['producción', 'alta disponibilidad', 'aplicaciones críticas']
-            },
-            'canary': {
-                'description': 'Despliegue gradual a un subconjunto de usuarios',
-                'complexity': 'high',
-                'downtime': 'zero',
-                'rollback_time': 'fast',
-                'use_cases': ['aplicaciones de alto tráfico', 'testing en producción']
-            },
-            'rolling': {
-                'description': 'Actualización gradual de instancias',
-                'complexity': 'medium',
-                'downtime': 'minimal',
-                'rollback_time': 'medium',
-                'use_cases': ['microservicios', 'aplicaciones distribuidas']
-            }
-        }
-        
-        self.cloud_providers = {
-            'local': {
-                'description': 'Despliegue local para desarrollo',
-                'cost': 'free',
-                'scalability': 'limited',
-                'availability': 'low'
-            },
-            'docker': {
-                'description': 'Contenedorización con Docker',
-                'cost': 'low',
-                'scalability': 'medium',
-                'availability': 'medium'
-            },
-            'kubernetes': {
-                'description': 'Orquestación con Kubernetes',
-                'cost': 'medium',
-                'scalability': 'high',
-                'availability': 'high'
-            }
-        }
-        
-        self.application_types = {
-            'web_app': {
-                'frameworks': ['flask', 'django', 'fastapi', 'express'],
-                'requirements': ['web_server', 'database', 'static_files'],
-                'recommended_strategy': 'blue_green'
-            },
-            'api': {
-                'frameworks': ['flask', 'fastapi', 'express'],
-                'requirements': ['web_server', 'database'],
-                'recommended_strategy': 'rolling'
-            },
-            'microservice': {
-                'frameworks': ['flask', 'fastapi', 'express'],
-                'requirements': ['container', 'service_discovery', 'load_balancer'],
-                'recommended_strategy': 'canary'
-            },
-            'static_site': {
-                'frameworks': ['react', 'vue', 'angular', 'html'],
-                'requirements': ['web_server', 'cdn'],
-                'recommended_strategy': 'simple'
-            }
-        }
-        
-        self.deployment_history = []
+        # Catálogos de solo lectura compartidos por todas las instancias
+        self.deployment_strategies = DEPLOYMENT_STRATEGIES
+        self.cloud_providers = CLOUD_PROVIDERS
+        self.application_types = APPLICATION_TYPES
+
+        self.deployment_history = deque(maxlen=DEPLOYMENT_HISTORY_SIZE)
+
+        self._analysis_cache = OrderedDict()
+        self._analysis_lock = threading.Lock()
     
+    @staticmethod
+    def _analysis_key(app_path: str, app_type: Optional[str]) -> Optional[tuple]:
+        """Clave de caché del análisis, o None si la ruta no existe"""
+        try:
+            mtimes = [os.stat(app_path).st_mtime_ns]
+        except OSError:
+            return None
+        for manifest in ANALYSIS_MANIFESTS:
+            try:
+                mtimes.append(os.stat(os.path.join(app_path, manifest)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (app_path, app_type, *mtimes)
+
     def analyze_application(self, app_path: str, app_type: str = None) -> Dict[str, Any]:
+        """Analiza una aplicación, reutilizando el resultado si el directorio no cambió"""
+        key = self._analysis_key(app_path, app_type)
+        if key is None:
+            return self._analyze_application(app_path, app_type)
+
+        with self._analysis_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return copy.copy(cached)
+
+        analysis = self._analyze_application(app_path, app_type)
+        if 'error' not in analysis:
+            with self._analysis_lock:
+                self._analysis_cache[key] = analysis
+                while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+        return copy.copy(analysis)
+
+    def _analyze_application(self, app_path: str, app_type: str = None) -> Dict[str, Any]:
         """Analiza una aplicación para determinar sus características"""
         analysis = {
             'path': app_path,
@@ -105,8 +236,18 @@ class DeploymentPlanner:
         }
         
         try:
-            # Verificar archivos de configuración
-            files_in_path = os.listdir(app_path) if os.path.exists(app_path) else []
+            # Verificar archivos de configuración: scandir ya informa el tipo de cada
+            # entrada, así que se clasifican archivos y directorios sin stats adicionales
+            # (solo los enlaces simbólicos necesitan uno, y cuentan según su destino)
+            files_in_path = set()
+            dirs_in_path = set()
+            if os.path.exists(app_path):
+                with os.scandir(app_path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            files_in_path.add(entry.name)
+                        elif entry.is_dir():
+                            dirs_in_path.add(entry.name)
             
             # Detectar framework
             if 'app.py' in files_in_path or 'main.py' in files_in_path:
@@ -119,32 +260,33 @@ class DeploymentPlanner:
             # Verificar dependencias
             if 'requirements.txt' in files_in_path:
                 try:
-                    with open(os.path.join(app_path, 'requirements.txt'), 'r') as f:
-                        analysis['dependencies'] = f.read().splitlines()
+                    # Se recorre el archivo línea a línea descartando comentarios y líneas vacías
+                    with open(os.path.join(app_path, 'requirements.txt'), 'r', encoding='utf-8', errors='ignore') as f:
+                        analysis['dependencies'] = [
+                            line.strip() for line in f
+                            if line.strip() and not line.lstrip().startswith('#')
+                        ]
                 except:
                     pass
             
             if 'package.json' in files_in_path:
                 try:
-                    with open(os.path.join(app_path, 'package.json'), 'r') as f:
-                        package_data = json.load(f)
-                        analysis['dependencies'] = list(package_data.get('dependencies', {}).keys())
+                    with open(os.path.join(app_path, 'package.json'), 'rb') as f:
+                        package_data = orjson.loads(f.read())
+                    analysis['dependencies'] = [
+                        *package_data.get('dependencies', {}),
+                        *package_data.get('devDependencies', {})
+                    ]
                 except:
                     pass
             
             # Verificar base de datos
-            db_indicators = ['sqlite', 'postgresql', 'mysql', 'mongodb', 'database']
-            analysis['database_required'] = any(
-                any(indicator in dep.lower() for indicator in db_indicators)
-                for dep in analysis['dependencies']
-            )
+            # Una sola búsqueda en C sobre todas las dependencias; se detiene en la primera
+            # coincidencia y ningún indicador puede abarcar el salto de línea separador
+            analysis['database_required'] = _DB_RE.search('\n'.join(analysis['dependencies'])) is not None
             
             # Verificar archivos estáticos
-            static_dirs = ['static', 'public', 'assets', 'dist', 'build']
-            analysis['static_files'] = any(
-                os.path.exists(os.path.join(app_path, static_dir))
-                for static_dir in static_dirs
-            )
+            analysis['static_files'] = not _STATIC_DIRS.isdisjoint(dirs_in_path)
             
             # Verificar Docker
             analysis['docker_ready'] = 'Dockerfile' in files_in_path
@@ -216,23 +358,16 @@ class DeploymentPlanner:
     def _calculate_confidence(self, app_analysis: Dict[str, Any], requirements: Dict[str, Any], 
                             strategy: str, provider: str) -> float:
         """Calcula el nivel de confianza en la recomendación"""
-        confidence = 0.5  # Base
-        
-        # Aumentar confianza si hay información completa
-        if app_analysis.get('framework'):
-            confidence += 0.1
-        if app_analysis.get('dependencies'):
-            confidence += 0.1
-        if 'complexity' in app_analysis:
-            confidence += 0.1
-        
-        # Ajustar por compatibilidad
-        if strategy in ['simple', 'rolling'] and app_analysis.get('complexity') == 'low':
-            confidence += 0.1
-        if strategy in ['blue_green', 'canary'] and requirements.get('availability') == 'high':
-            confidence += 0.1
-        
-        return min(confidence, 1.0)
+        # Un punto por cada dato completo del análisis y por cada compatibilidad
+        # entre la estrategia y la complejidad o la disponibilidad requerida
+        hits = (
+            bool(app_analysis.get('framework'))
+            + bool(app_analysis.get('dependencies'))
+            + ('complexity' in app_analysis)
+            + ((strategy, app_analysis.get('complexity')) in _FIT_BY_COMPLEXITY)
+            + ((strategy, requirements.get('availability')) in _FIT_BY_AVAILABILITY)
+        )
+        return min(round(CONFIDENCE_BASE + CONFIDENCE_STEP * hits, 2), 1.0)
     
     def _generate_reasoning(self, app_analysis: Dict[str, Any], requirements: Dict[str, Any], 
                            strategy: str, provider: str) -> List[str]:
@@ -307,138 +442,159 @@ class DeploymentPlanner:
     
     def _generate_docker_config(self, app_analysis: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
         """Genera configuración específica para Docker"""
-        framework = app_analysis.get('framework', 'unknown')
-        
-        dockerfile_content = ""
-        if framework == 'flask':
-            dockerfile_content = f"""
-FROM python:3.11-slim
-
-WORKDIR /app
-
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
-
-COPY . .
-
-EXPOSE {config['networking']['port']}
-
-CMD ["python", "app.py"]
-"""
-        elif framework == 'nodejs':
-            dockerfile_content = f"""
-FROM node:18-alpine
-
-WORKDIR /app
-
-COPY package*.json ./
-RUN npm install
-
-COPY . .
-
-EXPOSE {config['networking']['port']}
-
-CMD ["npm", "start"]
-"""
-        elif framework == 'static':
-            dockerfile_content = f"""
-FROM nginx:alpine
-
-COPY . /usr/share/nginx/html
-
-EXPOSE 80
-
-CMD ["nginx", "-g", "daemon off;"]
-"""
-        
-        return {
-            'dockerfile_content': dockerfile_content.strip(),
-            'build_command': f"docker build -t {config['application']['name']} .",
-            'run_command': f"docker run -p {config['networking']['port']}:{config['networking']['port']} {config['application']['name']}"
-        }
+        args = (
+            app_analysis.get('framework', 'unknown'),
+            config['networking']['port'],
+            config['application']['name']
+        )
+        try:
+            return dict(_docker_config(*args))
+        except TypeError:
+            # Valores no hashables en la petición: se generan sin pasar por la caché
+            return dict(_docker_config.__wrapped__(*args))
     
     def _generate_kubernetes_config(self, app_analysis: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
         """Genera configuración específica para Kubernetes"""
-        
-        deployment_yaml = {
-            'apiVersion': 'apps/v1',
-            'kind': 'Deployment',
-            'metadata': {
-                'name': f"{config['application']['name']}-deployment"
+        args = (
+            config['application']['name'],
+            config['resources']['replicas'],
+            config['networking']['port'],
+            config['resources']['cpu'],
+            config['resources']['memory'],
+            config['networking']['external_access']
+        )
+        try:
+            manifests = _kubernetes_manifests(*args)
+        except TypeError:
+            # Valores no hashables en la petición: se generan sin pasar por la caché
+            manifests = _kubernetes_manifests.__wrapped__(*args)
+
+        return {
+            'deployment_yaml': manifests[0],
+            'service_yaml': manifests[1],
+            'apply_commands': list(manifests[2])
+        }
+
+@lru_cache(maxsize=KUBERNETES_CACHE_SIZE)
+def _kubernetes_manifests(name, replicas, port, cpu, memory, external_access) -> tuple:
+    """Serializa los manifiestos Deployment y Service; depende solo de estos parámetros"""
+    deployment_yaml = {
+        'apiVersion': 'apps/v1',
+        'kind': 'Deployment',
+        'metadata': {
+            'name': f"{name}-deployment"
+        },
+        'spec': {
+            'replicas': replicas,
+            'selector': {
+                'matchLabels': {
+                    'app': name
+                }
             },
-            'spec': {
-                'replicas': config['resources']['replicas'],
-                'selector': {
-                    'matchLabels': {
-                        'app': config['application']['name']
+            'template': {
+                'metadata': {
+                    'labels': {
+                        'app': name
                     }
                 },
-                'template': {
-                    'metadata': {
-                        'labels': {
-                            'app': config['application']['name']
-                        }
-                    },
-                    'spec': {
-                        'containers': [{
-                            'name': config['application']['name'],
-                            'image': f"{config['application']['name']}:latest",
-                            'ports': [{
-                                'containerPort': config['networking']['port']
-                            }],
-                            'resources': {
-                                'requests': {
-                                    'cpu': config['resources']['cpu'],
-                                    'memory': config['resources']['memory']
-                                },
-                                'limits': {
-                                    'cpu': config['resources']['cpu'],
-                                    'memory': config['resources']['memory']
-                                }
+                'spec': {
+                    'containers': [{
+                        'name': name,
+                        'image': f"{name}:latest",
+                        'ports': [{
+                            'containerPort': port
+                        }],
+                        'resources': {
+                            'requests': {
+                                'cpu': cpu,
+                                'memory': memory
+                            },
+                            'limits': {
+                                'cpu': cpu,
+                                'memory': memory
                             }
-                        }]
-                    }
+                        }
+                    }]
                 }
             }
         }
-        
-        service_yaml = {
-            'apiVersion': 'v1',
-            'kind': 'Service',
-            'metadata': {
-                'name': f"{config['application']['name']}-service"
+    }
+
+    service_yaml = {
+        'apiVersion': 'v1',
+        'kind': 'Service',
+        'metadata': {
+            'name': f"{name}-service"
+        },
+        'spec': {
+            'selector': {
+                'app': name
             },
-            'spec': {
-                'selector': {
-                    'app': config['application']['name']
-                },
-                'ports': [{
-                    'port': 80,
-                    'targetPort': config['networking']['port']
-                }],
-                'type': 'LoadBalancer' if config['networking']['external_access'] else 'ClusterIP'
-            }
-        }
-        
-        return {
-            'deployment_yaml': yaml.dump(deployment_yaml, default_flow_style=False),
-            'service_yaml': yaml.dump(service_yaml, default_flow_style=False),
-            'apply_commands': [
-                f"kubectl apply -f {config['application']['name']}-deployment.yaml",
-                f"kubectl apply -f {config['application']['name']}-service.yaml"
-            ]
+            'ports': [{
+                'port': 80,
+                'targetPort': port
+            }],
+            'type': 'LoadBalancer' if external_access else 'ClusterIP'
         }
+    }
+
+    return (
+        yaml.dump(deployment_yaml, Dumper=YamlDumper, default_flow_style=False),
+        yaml.dump(service_yaml, Dumper=YamlDumper, default_flow_style=False),
+        (
+            f"kubectl apply -f {name}-deployment.yaml",
+            f"kubectl apply -f {name}-service.yaml"
+        )
+    )
+
+@lru_cache(maxsize=DOCKER_CACHE_SIZE)
+def _docker_config(framework, port, name) -> Dict[str, Any]:
+    """Genera el Dockerfile y los comandos de Docker; depende solo de estos parámetros"""
+    template = DOCKERFILE_TEMPLATES.get(framework, '')
+    return {
+        'dockerfile_content': template.format(port=port),
+        'build_command': f"docker build -t {name} .",
+        'run_command': f"docker run -p {port}:{port} {name}"
+    }
 
 class DeploymentExecutor:
     """Ejecutor de despliegues"""
     
     def __init__(self):
-        self.execution_history = []
+        self.execution_history = deque(maxlen=DEPLOYMENT_HISTORY_SIZE)
+        # Se incrementa con cada cambio del historial; sirve de ETag para /deployment-history
+        self.history_version = 0
+        # Ejecuciones por id para consultar su estado, acotadas como el historial
+        self._executions = OrderedDict()
+        self._lock = threading.Lock()
     
     def execute_deployment(self, deployment_config: Dict[str, Any]) -> Dict[str, Any]:
-        """Ejecuta un despliegue basado en la configuración"""
-        
-        execution_id = f"exec_{int(time.time())}"
+        """Ejecuta un despliegue basado en la configuración y espera a que termine"""
+        execution_result = self._register_execution(deployment_config)
+        self._run_deployment(execution_result, deployment_config)
+        return execution_result
+
+    def submit_deployment(self, deployment_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Encola un despliegue y devuelve su estado inicial sin esperar a que termine"""
+        execution_result = self._register_execution(deployment_config)
+        snapshot = dict(execution_result)
+        _DEPLOY_POOL.submit(self._run_deployment, execution_result, deployment_config)
+        return snapshot
+
+    def get_execution(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el estado de una ejecución, o None si no existe o ya se descartó"""
+        with self._lock:
+            execution_result = self._executions.get(execution_id)
+            return dict(execution_result) if execution_result is not None else None
+
+    def get_history(self) -> List[Dict[str, Any]]:
+        """Copia del historial de ejecuciones, de la más antigua a la más reciente"""
+        with self._lock:
+            return [dict(execution_result) for execution_result in self.execution_history]
+
+    def _register_execution(self, deployment_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Crea la ejecución en estado in_progress y la agrega al historial"""
+        execution_id = f"exec_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         
         execution_result = {
             'execution_id': execution_id,
@@ -449,7 +605,17 @@ class DeploymentExecutor:
             'provider': deployment_config['provider'],
             'strategy': deployment_config['strategy']
         }
-        
+
+        with self._lock:
+            self.execution_history.append(execution_result)
+            self._executions[execution_id] = execution_result
+            while len(self._executions) > DEPLOYMENT_HISTORY_SIZE:
+                self._executions.popitem(last=False)
+            self.history_version += 1
+        return execution_result
+
+    def _run_deployment(self, execution_result: Dict[str, Any], deployment_config: Dict[str, Any]):
+        """Ejecuta los pasos del despliegue y actualiza su estado"""
         try:
             # Ejecutar pasos según el proveedor
             if deployment_config['provider'] == 'local':
@@ -461,17 +627,24 @@ class DeploymentExecutor:
             else:
                 steps = [{'step': 'Proveedor no soportado', 'status': 'error'}]
             
-            execution_result['steps'] = steps
-            execution_result['status'] = 'completed' if all(s['status'] == 'success' for s in steps) else 'failed'
-            execution_result['end_time'] = datetime.now().isoformat()
+            outcome = {
+                'steps': steps,
+                'status': 'completed' if all(s['status'] == 'success' for s in steps) else 'failed',
+                'end_time': datetime.now().isoformat()
+            }
             
         except Exception as e:
-            execution_result['status'] = 'error'
-            execution_result['error'] = str(e)
-            execution_result['end_time'] = datetime.now().isoformat()
-        
-        self.execution_history.append(execution_result)
-        return execution_result
+            logger.warning("Error en el despliegue %s: %s", execution_result['execution_id'], e)
+            outcome = {
+                'status': 'error',
+                'error': str(e),
+                'end_time': datetime.now().isoformat()
+            }
+
+        # Se actualiza de una vez para que nadie lea un estado a medio escribir
+        with self._lock:
+            execution_result.update(outcome)
+            self.history_version += 1
     
     def _execute_local_deployment(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Ejecuta despliegue local (simulado)"""
@@ -481,9 +654,10 @@ class DeploymentExecutor:
             {'step': 'Iniciar aplicación', 'status': 'success', 'message': f"Aplicación disponible en puerto {config['networking']['port']}"}
         ]
         
+        # Pasos simulados: se completan al instante, sin bloquear el worker
+        timestamp = datetime.now().isoformat()
         for step in steps:
-            step['timestamp'] = datetime.now().isoformat()
-            time.sleep(1)  # Simular tiempo de ejecución
+            step['timestamp'] = timestamp
         
         return steps
     
@@ -496,9 +670,10 @@ class DeploymentExecutor:
             {'step': 'Verificar salud del contenedor', 'status': 'success', 'message': 'Contenedor saludable'}
         ]
         
+        # Pasos simulados: se completan al instante, sin bloquear el worker
+        timestamp = datetime.now().isoformat()
         for step in steps:
-            step['timestamp'] = datetime.now().isoformat()
-            time.sleep(1)  # Simular tiempo de ejecución
+            step['timestamp'] = timestamp
         
         return steps
     
@@ -512,9 +687,10 @@ class DeploymentExecutor:
             {'step': 'Verificar servicio', 'status': 'success', 'message': 'Servicio disponible externamente'}
         ]
         
+        # Pasos simulados: se completan al instante, sin bloquear el worker
+        timestamp = datetime.now().isoformat()
         for step in steps:
-            step['timestamp'] = datetime.now().isoformat()
-            time.sleep(1)  # Simular tiempo de ejecución
+            step['timestamp'] = timestamp
         
         return steps
 
@@ -522,6 +698,27 @@ class DeploymentExecutor:
 deployment_planner = DeploymentPlanner()
 deployment_executor = DeploymentExecutor()
 
+def _conditional_json(etag: str, build_body: Callable[[], bytes], cache_control: str) -> Response:
+    """Responde 304 sin construir el cuerpo si el cliente ya tiene esta versión"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = json_response(build_body())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+# El catálogo de estrategias es estático: se serializa una vez y por petición solo se
+# añade la marca de tiempo antes de la llave de cierre
+_STRATEGIES_PREFIX = orjson.dumps({
+    'strategies': DEPLOYMENT_STRATEGIES,
+    'providers': CLOUD_PROVIDERS,
+    'application_types': APPLICATION_TYPES,
+    'status': 'success'
+}, default=orjson_default)[:-1]
+_STRATEGIES_ETAG = hashlib.md5(_STRATEGIES_PREFIX).hexdigest()
+_STRATEGIES_CACHE_CONTROL = f'public, max-age={STRATEGIES_MAX_AGE}'
+
 @autonomous_deploy_bp.route('/analyze-app', methods=['POST'])
 @cross_origin()
 def analyze_application():
@@ -582,23 +779,44 @@ def deploy_application():
         if not deployment_config:
             return jsonify({'error': 'Configuración de despliegue requerida'}), 400
         
-        result = deployment_executor.execute_deployment(deployment_config)
-        return jsonify(result), 200
+        # El despliegue sigue en segundo plano; el cliente consulta GET /deploy/<execution_id>
+        result = deployment_executor.submit_deployment(deployment_config)
+        return jsonify(result), 202
         
     except Exception as e:
         return jsonify({'error': f'Error ejecutando despliegue: {str(e)}'}), 500
 
+@autonomous_deploy_bp.route('/deploy/<execution_id>', methods=['GET'])
+@cross_origin()
+def get_deployment_status(execution_id):
+    """Obtiene el estado de un despliegue en curso o terminado"""
+    try:
+        result = deployment_executor.get_execution(execution_id)
+        if result is None:
+            return jsonify({'error': 'Despliegue no encontrado'}), 404
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo despliegue: {str(e)}'}), 500
+
 @autonomous_deploy_bp.route('/deployment-history', methods=['GET'])
 @cross_origin()
 def get_deployment_history():
     """Obtiene el historial de despliegues"""
     try:
-        return jsonify({
-            'history': deployment_executor.execution_history,
-            'count': len(deployment_executor.execution_history),
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
+        # El pid distingue versiones de workers distintos, cada uno con su historial
+        etag = f'{os.getpid()}-{deployment_executor.history_version}'
+
+        def build_body() -> bytes:
+            history = deployment_executor.get_history()
+            return orjson.dumps({
+                'history': history,
+                'count': len(history),
+                'timestamp': datetime.now().isoformat(),
+                'status': 'success'
+            }, default=orjson_default)
+
+        return _conditional_json(etag, build_body, 'no-cache')
     except Exception as e:
         return jsonify({'error': f'Error obteniendo historial: {str(e)}'}), 500
 
@@ -607,13 +825,11 @@ def get_deployment_history():
 def get_strategies():
     """Obtiene las estrategias de despliegue disponibles"""
     try:
-        return jsonify({
-            'strategies': deployment_planner.deployment_strategies,
-            'providers': deployment_planner.cloud_providers,
-            'application_types': deployment_planner.application_types,
-            'timestamp': datetime.now().isoformat(),
-            'status': 'success'
-        }), 200
+        def build_body() -> bytes:
+            timestamp = datetime.now().isoformat().encode('ascii')
+            return _STRATEGIES_PREFIX + b',"timestamp":"' + timestamp + b'"}'
+
+        return _conditional_json(_STRATEGIES_ETAG, build_body, _STRATEGIES_CACHE_CONTROL)
     except Exception as e:
         return jsonify({'error': f'Error obteniendo estrategias: {str(e)}'}), 500
 
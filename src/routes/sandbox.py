@@ -2,146 +2,510 @@
 Sistema de Sandbox para ejecución segura de código
 """
 import subprocess
-import tempfile
 import os
+import select
+import selectors
 import signal
-import json
+import codecs
+import queue
+import socket
+import struct
 import time
-from flask import Blueprint, request, jsonify
+import orjson
+from flask import Blueprint, Response, jsonify, request
 from flask_cors import cross_origin
 import docker
-from typing import Dict, Any, Optional
+import requests
+from docker.utils.socket import STDERR, frames_iter
+from types import MappingProxyType
+from typing import Callable, Dict, Any, Iterator, NamedTuple, Optional, Tuple
 import threading
 import psutil
+import re
+from src.utils.container_pool import WarmContainerPool
+from src.utils.json_provider import json_response
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 sandbox_bp = Blueprint("sandbox", __name__)
 
+# Contenedores precalentados por lenguaje cuando Docker está disponible
+SANDBOX_POOL_SIZE = int(os.getenv('SANDBOX_POOL_SIZE', '2'))
+# Ejecuciones simultáneas por proceso; las demás esperan un hueco como mucho
+# SANDBOX_QUEUE_TIMEOUT segundos antes de rechazarse con 503
+SANDBOX_MAX_CONCURRENT = int(os.getenv('SB_MAX_CONCURRENT', str((os.cpu_count() or 1) * 2)))
+SANDBOX_QUEUE_TIMEOUT = 0.5
+# Segundos durante los que se reutiliza la comprobación de Docker
+DOCKER_CHECK_TTL = 30
+# Registro espejo opcional (p. ej. una caché pull-through local) para las imágenes
+SANDBOX_IMAGE_REGISTRY = os.getenv('SANDBOX_IMAGE_REGISTRY', '').rstrip('/')
+
+# Medio núcleo y 64 procesos por contenedor: un bucle o una fork bomb no deja sin CPU
+# al host ni a las demás ejecuciones
+SANDBOX_CPU_PERIOD = 100000
+SANDBOX_CPU_QUOTA = 50000
+SANDBOX_PIDS_LIMIT = 64
+# Perfil seccomp opcional (JSON) más restrictivo que el de Docker por defecto
+SANDBOX_SECCOMP_PROFILE = os.getenv('SANDBOX_SECCOMP_PROFILE', '')
+
+def _load_seccomp_profile(path: str) -> Optional[str]:
+    """Contenido del perfil seccomp: la API de Docker lo recibe en línea, no como ruta"""
+    if not path:
+        return None
+    with open(path, 'rb') as f:
+        return orjson.dumps(orjson.loads(f.read())).decode('utf-8')
+
+_SECCOMP_PROFILE = _load_seccomp_profile(SANDBOX_SECCOMP_PROFILE)
+
+# Tamaño máximo del cuerpo de las peticiones: 10000 caracteres de código escapados en
+# JSON (\uXXXX) más los datos de entrada caben de sobra
+SANDBOX_MAX_BODY = 64 * 1024
+
+# Bytes de salida (por flujo) que se devuelven como máximo, y tamaño de lectura
+OUTPUT_LIMIT = 64 * 1024
+OUTPUT_CHUNK_SIZE = 4096
+# Espera máxima a los pipes (o al hilo que escribe la entrada) una vez terminado el proceso
+PIPE_JOIN_TIMEOUT = 1
+
+# Filtros básicos de seguridad
+DANGEROUS_PATTERNS = (
+    'import os', 'import subprocess', 'import sys',
+    'eval(', 'exec(', '__import__',
+    'open(', 'file(', 'input(',
+    'raw_input(', 'compile(',
+    'rm -rf', 'sudo', 'wget', 'curl'
+)
+_DANGEROUS_RE = re.compile('|'.join(map(re.escape, DANGEROUS_PATTERNS)), re.IGNORECASE)
+
+# Autómata Aho–Corasick: una sola pasada en C sobre el código para todos los
+# patrones; si pyahocorasick no está instalado se usa la expresión regular
+if ahocorasick is not None:
+    _DANGEROUS_AUTOMATON = ahocorasick.Automaton()
+    for pattern in DANGEROUS_PATTERNS:
+        _DANGEROUS_AUTOMATON.add_word(pattern, pattern)
+    _DANGEROUS_AUTOMATON.make_automaton()
+else:
+    _DANGEROUS_AUTOMATON = None
+
+def find_dangerous_pattern(code: str) -> Optional[str]:
+    """Primer patrón peligroso presente en el código (sin distinguir mayúsculas), o None"""
+    if _DANGEROUS_AUTOMATON is not None:
+        # El autómata distingue mayúsculas y pyahocorasick (compilado en modo unicode)
+        # solo acepta str: se pasa a minúsculas una vez, sin recorrer el código antes
+        for _, pattern in _DANGEROUS_AUTOMATON.iter(code.lower()):
+            return pattern
+        return None
+    match = _DANGEROUS_RE.search(code)
+    return match.group(0).lower() if match else None
+
+class BoundedOutput:
+    """Acumula una salida conservando solo sus últimos `limit` bytes
+
+    Un programa que escribe en bucle no puede agotar la memoria del worker antes de
+    que salte el timeout.
+    """
+
+    def __init__(self, limit: int = OUTPUT_LIMIT, on_write: Optional[Callable[[bytes], None]] = None):
+        self.limit = limit
+        self.truncated = False
+        self.on_write = on_write
+        self._buffer = bytearray()
+
+    def write(self, chunk: bytes):
+        if self.on_write is not None:
+            self.on_write(chunk)
+        self._buffer += chunk
+        # Se recorta por lotes para no desplazar el buffer en cada fragmento
+        if len(self._buffer) > 2 * self.limit:
+            del self._buffer[:-self.limit]
+            self.truncated = True
+
+    def text(self) -> str:
+        if len(self._buffer) > self.limit:
+            del self._buffer[:-self.limit]
+            self.truncated = True
+        text = self._buffer.decode('utf-8', errors='replace')
+        if self.truncated:
+            return f"[Salida truncada: se muestran los últimos {self.limit // 1024}KB]\n{text}"
+        return text
+
+def _combine_output(stdout: BoundedOutput, stderr: BoundedOutput) -> str:
+    """Salida estándar seguida, si la hay, de la de error"""
+    output = stdout.text()
+    errors = stderr.text()
+    if errors:
+        output += f"\n--- STDERR ---\n{errors}"
+    return output
+
+def _communicate(process: subprocess.Popen, data: bytes, stdout: BoundedOutput, stderr: BoundedOutput,
+                 timeout: float) -> bool:
+    """Escribe la entrada y lee ambas salidas en el hilo actual; True si se agota el tiempo
+
+    Como communicate(), multiplexa los pipes con selectors en lugar de usar un hilo por
+    pipe, pero la salida se acumula acotada a medida que llega.
+    """
+    deadline = time.monotonic() + timeout
+    if os.name == 'nt':
+        # En Windows selectors no admite pipes: communicate() sin acotar la salida
+        try:
+            out, err = process.communicate(data, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return True
+        stdout.write(out)
+        stderr.write(err)
+        return False
+    
+    outputs = {process.stdout: stdout, process.stderr: stderr}
+    pending = memoryview(data)
+    with selectors.DefaultSelector() as selector:
+        for pipe in outputs:
+            selector.register(pipe, selectors.EVENT_READ)
+        if pending:
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        else:
+            process.stdin.close()
+        
+        try:
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return True
+                ready = selector.select(min(remaining, PIPE_JOIN_TIMEOUT))
+                if not ready and process.poll() is not None:
+                    # Un nieto que escape del grupo podría mantener el pipe abierto
+                    break
+                for key, _ in ready:
+                    pipe = key.fileobj
+                    if pipe is process.stdin:
+                        try:
+                            # Con el pipe listo, PIPE_BUF bytes se escriben sin bloquear
+                            pending = pending[os.write(pipe.fileno(), pending[:select.PIPE_BUF]):]
+                        except BrokenPipeError:
+                            # El programa terminó sin leer toda la entrada
+                            pending = pending[:0]
+                        if not pending:
+                            selector.unregister(pipe)
+                            pipe.close()
+                        continue
+                    chunk = os.read(pipe.fileno(), OUTPUT_CHUNK_SIZE)
+                    if chunk:
+                        outputs[pipe].write(chunk)
+                    else:
+                        selector.unregister(pipe)
+                        pipe.close()
+        finally:
+            for pipe in (process.stdin, *outputs):
+                pipe.close()
+    
+    try:
+        process.wait(timeout=max(deadline - time.monotonic(), 0))
+    except subprocess.TimeoutExpired:
+        # Cerró sus salidas pero sigue ejecutándose
+        return True
+    return False
+
+def _iter_frames(sock, deadline: float) -> Iterator[Tuple[int, bytes]]:
+    """Tramas (flujo, datos) de un attach de Docker sin TTY; socket.timeout al pasar `deadline`
+
+    A diferencia de frames_iter de docker, respeta el timeout del socket, así que el
+    límite de tiempo se aplica en el hilo que lee sin un temporizador aparte.
+    """
+    buffer = bytearray()
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout()
+        sock.settimeout(remaining)
+        chunk = sock.recv(OUTPUT_CHUNK_SIZE)
+        if not chunk:
+            return
+        buffer += chunk
+        # Cabecera de 8 bytes: flujo (1 byte), 3 de relleno y longitud big-endian
+        while len(buffer) >= 8:
+            stream, length = struct.unpack_from('>BxxxL', buffer)
+            if len(buffer) < 8 + length:
+                break
+            yield stream, bytes(buffer[8:8 + length])
+            del buffer[:8 + length]
+
+def _feed_socket(sock, data: bytes):
+    """Escribe la entrada en el stdin de un exec de Docker y cierra la escritura (EOF)"""
+    try:
+        sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        # El programa terminó sin leer toda la entrada
+        pass
+
+class LanguageConfig(NamedTuple):
+    """Configuración de ejecución de un lenguaje"""
+    extension: str
+    command: Tuple[str, ...]
+    inline_flag: str
+    timeout: int
+    memory_limit: str
+    image: str
+    # El intérprete acepta el código como /proc/self/fd/N (node resuelve la ruta
+    # real del script y falla con un memfd)
+    runs_from_fd: bool = False
+    # Programa que arranca el intérprete en el contenedor precalentado y espera el
+    # código por stdin; sin él, el código se ejecuta con exec en un contenedor en espera
+    runner: Optional[str] = None
+
+    def as_json(self) -> Dict[str, Any]:
+        """Configuración pública, tal como la muestra /languages"""
+        return {
+            'extension': self.extension,
+            'command': list(self.command),
+            'timeout': self.timeout,
+            'memory_limit': self.memory_limit
+        }
+
+# Intérprete de Python precalentado: lee una cabecera "<bytes de código> <bytes de
+# entrada>", el código y la entrada, y ejecuta el código como __main__ con esa
+# entrada como stdin. Ahorra el arranque de python3 en cada ejecución
+_PYTHON_RUNNER = '''
+import io, sys, traceback
+header = sys.stdin.buffer.readline().split()
+code = sys.stdin.buffer.read(int(header[0])).decode('utf-8')
+data = sys.stdin.buffer.read(int(header[1]))
+sys.stdin = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+sys.argv = ['<sandbox>']
+namespace = {'__name__': '__main__', '__builtins__': __builtins__}
+del io, header, data
+try:
+    exec(compile(code, '<sandbox>', 'exec'), namespace)
+except SystemExit:
+    raise
+except BaseException as error:
+    traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+    sys.exit(1)
+'''
+
+# Tabla de solo lectura: se consulta en cada ejecución y nunca cambia
+SUPPORTED_LANGUAGES = MappingProxyType({
+    'python': LanguageConfig(
+        extension='.py', command=('python3',), inline_flag='-c',
+        timeout=30, memory_limit='128m', image='python:3.11-alpine', runs_from_fd=True,
+        runner=_PYTHON_RUNNER
+    ),
+    'javascript': LanguageConfig(
+        extension='.js', command=('node',), inline_flag='-e',
+        timeout=30, memory_limit='128m', image='node:18-alpine'
+    ),
+    'bash': LanguageConfig(
+        extension='.sh', command=('bash',), inline_flag='-c',
+        timeout=15, memory_limit='64m', image='alpine:latest', runs_from_fd=True
+    )
+})
+_LANGUAGE_NAMES = tuple(SUPPORTED_LANGUAGES)
+_LANGUAGE_CONFIGURATIONS = {name: config.as_json() for name, config in SUPPORTED_LANGUAGES.items()}
+
 class CodeSandbox:
     """Sandbox para ejecución segura de código"""
     
-    SUPPORTED_LANGUAGES = {
-        'python': {
-            'extension': '.py',
-            'command': ['python3'],
-            'timeout': 30,
-            'memory_limit': '128m'
-        },
-        'javascript': {
-            'extension': '.js',
-            'command': ['node'],
-            'timeout': 30,
-            'memory_limit': '128m'
-        },
-        'bash': {
-            'extension': '.sh',
-            'command': ['bash'],
-            'timeout': 15,
-            'memory_limit': '64m'
-        }
-    }
+    SUPPORTED_LANGUAGES = SUPPORTED_LANGUAGES
     
     def __init__(self):
-        self.docker_available = self._check_docker()
+        self._docker = None
+        # No se consulta al daemon al importar: el primer acceso a docker_available lo hace
+        self._docker_available = False
+        self._docker_checked_at = None
+        # Se llena en el primer uso (descargando antes las imágenes que falten): con
+        # --preload el maestro no debe arrancar contenedores
+        self.container_pool = WarmContainerPool(
+            self._docker_client, self._container_options, self.SUPPORTED_LANGUAGES, size=SANDBOX_POOL_SIZE
+        )
+        # Acota los contenedores (y procesos de 128MB) vivos a la vez
+        self._slots = threading.BoundedSemaphore(SANDBOX_MAX_CONCURRENT)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+    
+    def _docker_client(self):
+        """Cliente Docker compartido por proceso; tras un fork se crea uno nuevo para no
+        compartir el socket del daemon con el proceso padre"""
+        pid = os.getpid()
+        if self._docker is None or self._docker[0] != pid:
+            self._docker = (pid, docker.from_env())
+        return self._docker[1]
+    
+    @property
+    def docker_available(self) -> bool:
+        """Disponibilidad de Docker, revalidada como mucho cada DOCKER_CHECK_TTL segundos"""
+        now = time.monotonic()
+        if self._docker_checked_at is None or now - self._docker_checked_at > DOCKER_CHECK_TTL:
+            # Se marca antes de consultar para que una ráfaga no repita el ping
+            self._docker_checked_at = now
+            self._docker_available = self._check_docker()
+        return self._docker_available
     
     def _check_docker(self) -> bool:
         """Verificar si Docker está disponible"""
         try:
-            docker.from_env().ping()
+            self._docker_client().ping()
             return True
         except:
+            # Si el daemon se reinicia, la próxima comprobación abre un cliente nuevo
+            self._docker = None
             return False
     
-    def execute_code(self, code: str, language: str, input_data: str = "") -> Dict[str, Any]:
-        """Ejecutar código en sandbox"""
+    def execute_code(self, code: str, language: str, input_data: str = "",
+                     on_output: Optional[Callable[[str, bytes], None]] = None) -> Dict[str, Any]:
+        """Ejecutar código en sandbox
+
+        Si se indica `on_output`, recibe ('stdout' | 'stderr', bytes) a medida que el
+        programa escribe, además de la salida acotada del resultado.
+        """
         if language not in self.SUPPORTED_LANGUAGES:
             return {
                 'success': False,
                 'error': f'Lenguaje no soportado: {language}',
-                'supported_languages': list(self.SUPPORTED_LANGUAGES.keys())
+                'supported_languages': list(_LANGUAGE_NAMES)
             }
         
         lang_config = self.SUPPORTED_LANGUAGES[language]
         
-        if self.docker_available:
-            return self._execute_with_docker(code, language, input_data, lang_config)
-        else:
-            return self._execute_with_subprocess(code, language, input_data, lang_config)
+        if not self._slots.acquire(timeout=SANDBOX_QUEUE_TIMEOUT):
+            return {
+                'success': False,
+                'error': 'El sandbox está ocupado, inténtalo de nuevo en unos segundos',
+                'busy': True,
+                'language': language
+            }
+        
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            if self.docker_available:
+                return self._execute_with_docker(code, language, input_data, lang_config, on_output)
+            else:
+                return self._execute_with_subprocess(code, language, input_data, lang_config, on_output)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            self._slots.release()
+    
+    @property
+    def in_flight(self) -> int:
+        """Ejecuciones en curso en este proceso"""
+        return self._in_flight
+    
+    def stream_code(self, code: str, language: str, input_data: str = "") -> Iterator[bytes]:
+        """Ejecuta el código entregando la salida como líneas NDJSON a medida que llega
+
+        Cada línea es {"stdout": ...} o {"stderr": ...}; la última es el resultado de
+        execute_code sin `output`, con "done": true. Se reenvían como mucho OUTPUT_LIMIT
+        bytes por flujo. Si el cliente se desconecta, la ejecución sigue hasta terminar
+        o agotar su timeout, que es lo que acota el hueco ocupado.
+        """
+        frames = queue.Queue()
+        sent = {'stdout': 0, 'stderr': 0}
+        
+        def forward(name: str, chunk: bytes):
+            if sent[name] < OUTPUT_LIMIT:
+                chunk = chunk[:OUTPUT_LIMIT - sent[name]]
+                sent[name] += len(chunk)
+                frames.put((name, chunk))
+        
+        def run():
+            try:
+                result = self.execute_code(code, language, input_data, on_output=forward)
+            except Exception as e:
+                result = {'success': False, 'error': f'Error interno: {str(e)}', 'language': language}
+            frames.put(('done', result))
+        
+        threading.Thread(target=run, name='sandbox-stream', daemon=True).start()
+        
+        # Decodificadores incrementales: un carácter UTF-8 puede quedar partido entre
+        # dos fragmentos
+        decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in sent}
+        while True:
+            name, payload = frames.get()
+            if name == 'done':
+                break
+            text = decoders[name].decode(payload)
+            if text:
+                yield orjson.dumps({name: text}) + b'\n'
+        
+        for name, decoder in decoders.items():
+            text = decoder.decode(b'', final=True)
+            if text:
+                yield orjson.dumps({name: text}) + b'\n'
+        payload.pop('output', None)
+        payload['done'] = True
+        payload['truncated'] = any(count >= OUTPUT_LIMIT for count in sent.values())
+        yield orjson.dumps(payload) + b'\n'
+    
+    @staticmethod
+    def _outputs(on_output: Optional[Callable[[str, bytes], None]]) -> Tuple[BoundedOutput, BoundedOutput]:
+        """Salidas acotadas de stdout y stderr, reenviando cada fragmento si se pide"""
+        if on_output is None:
+            return BoundedOutput(), BoundedOutput()
+        return (
+            BoundedOutput(on_write=lambda chunk: on_output('stdout', chunk)),
+            BoundedOutput(on_write=lambda chunk: on_output('stderr', chunk))
+        )
     
-    def _execute_with_docker(self, code: str, language: str, input_data: str, lang_config: Dict) -> Dict[str, Any]:
+    def _image(self, language: str) -> str:
+        image = self.SUPPORTED_LANGUAGES[language].image
+        return f"{SANDBOX_IMAGE_REGISTRY}/{image}" if SANDBOX_IMAGE_REGISTRY else image
+    
+    def _container_options(self, language: str) -> Dict[str, Any]:
+        """Opciones de aislamiento de los contenedores del sandbox"""
+        lang_config = self.SUPPORTED_LANGUAGES[language]
+        options = {
+            'image': self._image(language),
+            'mem_limit': lang_config.memory_limit,
+            'cpu_period': SANDBOX_CPU_PERIOD,
+            'cpu_quota': SANDBOX_CPU_QUOTA,
+            'pids_limit': SANDBOX_PIDS_LIMIT,
+            'network_disabled': True,
+            'security_opt': ['no-new-privileges:true'],
+            'cap_drop': ['ALL'],
+            'read_only': True,
+            'tmpfs': {'/tmp': 'noexec,nosuid,size=10m'}
+        }
+        if _SECCOMP_PROFILE:
+            options['security_opt'].append(f'seccomp={_SECCOMP_PROFILE}')
+        if lang_config.runner:
+            options['command'] = [*lang_config.command, '-c', lang_config.runner]
+            options['stdin_open'] = True
+        return options
+    
+    def _execute_with_docker(self, code: str, language: str, input_data: str, lang_config: LanguageConfig,
+                             on_output: Optional[Callable[[str, bytes], None]] = None) -> Dict[str, Any]:
         """Ejecutar código usando Docker (más seguro)"""
+        container = None
         try:
-            client = docker.from_env()
-            
-            # Imagen base según el lenguaje
-            images = {
-                'python': 'python:3.11-alpine',
-                'javascript': 'node:18-alpine',
-                'bash': 'alpine:latest'
-            }
-            
-            image = images.get(language, 'alpine:latest')
+            # Contenedor ya arrancado; el código viaja por stdin o como argumento del
+            # exec, sin archivos temporales ni volúmenes del host
+            container = self.container_pool.claim(language)
+            stdout, stderr = self._outputs(on_output)
             
-            # Crear archivo temporal con el código
-            with tempfile.NamedTemporaryFile(mode='w', suffix=lang_config['extension'], delete=False) as f:
-                f.write(code)
-                temp_file = f.name
+            start_time = time.time()
+            if lang_config.runner:
+                exit_code, timed_out = self._run_in_runner(container, code, input_data, lang_config, stdout, stderr)
+            else:
+                exit_code, timed_out = self._run_with_exec(container, code, input_data, lang_config, stdout, stderr)
+            execution_time = time.time() - start_time
             
-            try:
-                # Configurar volumen para el archivo
-                volume_mapping = {
-                    os.path.dirname(temp_file): {'bind': '/code', 'mode': 'ro'}
+            if timed_out:
+                return {
+                    'success': False,
+                    'error': f'Timeout: El código tardó más de {lang_config.timeout} segundos',
+                    'language': language
                 }
-                
-                # Comando de ejecución
-                filename = os.path.basename(temp_file)
-                command = lang_config['command'] + [f'/code/{filename}']
-                
-                # Ejecutar contenedor
-                container = client.containers.run(
-                    image,
-                    command=command,
-                    volumes=volume_mapping,
-                    stdin_open=True,
-                    stdout=True,
-                    stderr=True,
-                    remove=True,
-                    detach=True,
-                    mem_limit=lang_config['memory_limit'],
-                    network_disabled=True,
-                    security_opt=['no-new-privileges:true'],
-                    cap_drop=['ALL'],
-                    read_only=True,
-                    tmpfs={'/tmp': 'noexec,nosuid,size=10m'}
-                )
-                
-                # Enviar input si existe
-                if input_data:
-                    container.exec_run(f'echo "{input_data}"', stdin=True)
-                
-                # Esperar resultado con timeout
-                try:
-                    result = container.wait(timeout=lang_config['timeout'])
-                    logs = container.logs(stdout=True, stderr=True).decode('utf-8')
-                    
-                    return {
-                        'success': result['StatusCode'] == 0,
-                        'output': logs,
-                        'exit_code': result['StatusCode'],
-                        'execution_time': None,
-                        'language': language
-                    }
-                
-                except docker.errors.ContainerError as e:
-                    return {
-                        'success': False,
-                        'error': 'Error en ejecución del contenedor',
-                        'output': str(e),
-                        'language': language
-                    }
-                
-            finally:
-                # Limpiar archivo temporal
-                os.unlink(temp_file)
+            
+            return {
+                'success': exit_code == 0,
+                'output': _combine_output(stdout, stderr),
+                'exit_code': exit_code,
+                'execution_time': round(execution_time, 3),
+                'language': language
+            }
                 
         except Exception as e:
             return {
@@ -149,76 +513,159 @@ class CodeSandbox:
                 'error': f'Error en Docker: {str(e)}',
                 'language': language
             }
+        
+        finally:
+            if container is not None:
+                self.container_pool.discard(container)
     
-    def _execute_with_subprocess(self, code: str, language: str, input_data: str, lang_config: Dict) -> Dict[str, Any]:
+    @staticmethod
+    def _run_with_exec(container, code: str, input_data: str, lang_config: LanguageConfig,
+                       stdout: BoundedOutput, stderr: BoundedOutput) -> Tuple[int, bool]:
+        """Ejecuta el código con exec en un contenedor en espera; devuelve (código, timeout)"""
+        timeout = lang_config.timeout
+        command = ['timeout', '-s', 'KILL', str(timeout), *lang_config.command, lang_config.inline_flag, code]
+        
+        # exec de bajo nivel para leer la salida en streaming y acotarla
+        api = container.client.api
+        exec_id = api.exec_create(container.id, command, stdin=bool(input_data))['Id']
+        start_time = time.monotonic()
+        if input_data:
+            # Con entrada se usa el socket del exec: la entrada se escribe en un hilo
+            # mientras se lee la salida, para no bloquearse si el programa escribe
+            # antes de leer
+            sock = api.exec_start(exec_id, socket=True)
+            feeder = threading.Thread(
+                target=_feed_socket, args=(getattr(sock, '_sock', sock), input_data.encode('utf-8')), daemon=True
+            )
+            feeder.start()
+            try:
+                for stream, chunk in frames_iter(sock, tty=False):
+                    (stderr if stream == STDERR else stdout).write(chunk)
+            finally:
+                sock.close()
+            feeder.join(timeout=PIPE_JOIN_TIMEOUT)
+        else:
+            for out_chunk, err_chunk in api.exec_start(exec_id, stream=True, demux=True):
+                if out_chunk:
+                    stdout.write(out_chunk)
+                if err_chunk:
+                    stderr.write(err_chunk)
+        exit_code = api.exec_inspect(exec_id)['ExitCode']
+        
+        # `timeout -s KILL` termina el proceso con 128 + 9
+        return exit_code, exit_code == 137 and time.monotonic() - start_time >= timeout
+    
+    @staticmethod
+    def _run_in_runner(container, code: str, input_data: str, lang_config: LanguageConfig,
+                       stdout: BoundedOutput, stderr: BoundedOutput) -> Tuple[int, bool]:
+        """Entrega el código al intérprete ya arrancado del contenedor; devuelve (código, timeout)"""
+        api = container.client.api
+        code_bytes = code.encode('utf-8')
+        input_bytes = input_data.encode('utf-8')
+        
+        deadline = time.monotonic() + lang_config.timeout
+        timed_out = False
+        
+        # Una sola conexión para la entrada y la salida, abierta antes de enviar el
+        # código: no se pierde nada aunque el programa termine enseguida
+        sock = api.attach_socket(container.id, params={'stdin': 1, 'stdout': 1, 'stderr': 1, 'stream': 1})
+        try:
+            raw = getattr(sock, '_sock', sock)
+            raw.settimeout(lang_config.timeout)
+            raw.sendall(f'{len(code_bytes)} {len(input_bytes)}\n'.encode('ascii') + code_bytes + input_bytes)
+            try:
+                for stream, chunk in _iter_frames(raw, deadline):
+                    (stderr if stream == STDERR else stdout).write(chunk)
+            except socket.timeout:
+                timed_out = True
+        finally:
+            sock.close()
+        
+        # Los contenedores con intérprete no usan auto_remove (los destruye el pool
+        # al descartarlos), así que siguen existiendo para consultar su estado
+        status = {}
+        if not timed_out:
+            try:
+                status = api.wait(container.id, timeout=max(deadline - time.monotonic(), 0.1))
+            except requests.exceptions.ReadTimeout:
+                # Cerró sus salidas pero sigue ejecutándose
+                timed_out = True
+        if timed_out:
+            try:
+                container.kill()
+            except Exception:
+                pass
+        
+        return status.get('StatusCode', -1), timed_out
+    
+    @staticmethod
+    def _kill_process_group(process: subprocess.Popen):
+        """Termina el proceso y todos sus hijos"""
+        try:
+            if os.name != 'nt':
+                os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def _execute_with_subprocess(self, code: str, language: str, input_data: str, lang_config: LanguageConfig,
+                                 on_output: Optional[Callable[[str, bytes], None]] = None) -> Dict[str, Any]:
         """Ejecutar código usando subprocess (menos seguro pero más compatible)"""
         try:
-            # Crear archivo temporal
-            with tempfile.NamedTemporaryFile(mode='w', suffix=lang_config['extension'], delete=False) as f:
-                f.write(code)
-                temp_file = f.name
+            start_time = time.time()
+            
+            # El código va en un memfd heredado por el proceso: sin archivo en disco y
+            # sin exponerlo en la línea de comandos (visible para cualquier usuario en
+            # ps). Si no se puede, va como argumento (-c / -e); stdin queda libre para
+            # los datos de entrada
+            code_fd = None
+            if lang_config.runs_from_fd and hasattr(os, 'memfd_create'):
+                code_fd = os.memfd_create('sandbox-code', os.MFD_CLOEXEC)
+                os.write(code_fd, code.encode('utf-8'))
+                os.lseek(code_fd, 0, os.SEEK_SET)
+                command = [*lang_config.command, f'/proc/self/fd/{code_fd}']
+            else:
+                command = [*lang_config.command, lang_config.inline_flag, code]
             
+            # Ejecutar con límites de tiempo y recursos
             try:
-                start_time = time.time()
-                
-                # Configurar comando
-                command = lang_config['command'] + [temp_file]
-                
-                # Ejecutar con límites de tiempo y recursos
                 process = subprocess.Popen(
                     command,
                     stdin=subprocess.PIPE,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    text=True,
-                    preexec_fn=os.setsid if os.name != 'nt' else None
+                    pass_fds=(code_fd,) if code_fd is not None else (),
+                    # Nuevo grupo de procesos para poder matar también a los hijos. A
+                    # diferencia de preexec_fn, no obliga a subprocess a usar fork
+                    start_new_session=(os.name != 'nt')
                 )
-                
-                # Configurar timeout y límites de memoria
-                def kill_process():
-                    if process.poll() is None:
-                        try:
-                            if os.name != 'nt':
-                                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                            else:
-                                process.terminate()
-                        except:
-                            pass
-                
-                timer = threading.Timer(lang_config['timeout'], kill_process)
-                timer.start()
-                
-                try:
-                    # Ejecutar y obtener resultado
-                    stdout, stderr = process.communicate(input=input_data, timeout=lang_config['timeout'])
-                    execution_time = time.time() - start_time
-                    
-                    output = stdout
-                    if stderr:
-                        output += f"\n--- STDERR ---\n{stderr}"
-                    
-                    return {
-                        'success': process.returncode == 0,
-                        'output': output,
-                        'exit_code': process.returncode,
-                        'execution_time': round(execution_time, 3),
-                        'language': language
-                    }
-                
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    return {
-                        'success': False,
-                        'error': f'Timeout: El código tardó más de {lang_config["timeout"]} segundos',
-                        'language': language
-                    }
-                
-                finally:
-                    timer.cancel()
-                    
             finally:
-                # Limpiar archivo temporal
-                os.unlink(temp_file)
+                # El hijo ya tiene su copia del descriptor
+                if code_fd is not None:
+                    os.close(code_fd)
+            
+            # Entrada y salidas se atienden en este mismo hilo; la salida queda acotada
+            stdout, stderr = self._outputs(on_output)
+            if _communicate(process, input_data.encode('utf-8'), stdout, stderr, lang_config.timeout):
+                # Se mata el grupo completo para no dejar procesos hijos vivos y se
+                # recoge el proceso para no dejar zombis
+                self._kill_process_group(process)
+                process.wait()
+                return {
+                    'success': False,
+                    'error': f'Timeout: El código tardó más de {lang_config.timeout} segundos',
+                    'language': language
+                }
+            
+            execution_time = time.time() - start_time
+            return {
+                'success': process.returncode == 0,
+                'output': _combine_output(stdout, stderr),
+                'exit_code': process.returncode,
+                'execution_time': round(execution_time, 3),
+                'language': language
+            }
                 
         except Exception as e:
             return {
@@ -230,51 +677,102 @@ class CodeSandbox:
 # Instancia global del sandbox
 code_sandbox = CodeSandbox()
 
+def _load_json_body() -> Any:
+    """Cuerpo JSON parseado con orjson, o None si no es JSON (como get_json(silent=True))"""
+    if not request.is_json:
+        return None
+    try:
+        # Sin caché: el cuerpo crudo no se queda retenido en request.data
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+
+# Campos de /execute que, si vienen, deben ser texto (null equivale a ausente)
+_EXECUTE_TEXT_FIELDS = ('code', 'language', 'input')
+
+def _validate_execute_payload(data: Any) -> Optional[str]:
+    """Mensaje de error si el cuerpo de /execute no tiene la forma esperada, o None"""
+    if not data or not isinstance(data, dict):
+        return 'No se proporcionaron datos'
+    for field in _EXECUTE_TEXT_FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            return f"El campo '{field}' debe ser texto"
+    return None
+
+# Longitud máxima del código (10KB)
+MAX_CODE_LENGTH = 10000
+
+def _validate_execute(code: str, language: str) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Primer error (cuerpo, estado) de una ejecución, o None si es válida
+
+    Las comprobaciones van de la más barata a la más cara: el escaneo de patrones
+    peligrosos recorre todo el código y solo se hace si lo demás es válido.
+    """
+    if not code:
+        return {'error': 'El código no puede estar vacío'}, 400
+    
+    if not language:
+        return {'error': 'Debe especificar un lenguaje'}, 400
+    
+    if language not in SUPPORTED_LANGUAGES:
+        return {
+            'error': f'Lenguaje no soportado: {language}',
+            'supported_languages': list(_LANGUAGE_NAMES)
+        }, 400
+    
+    if len(code) > MAX_CODE_LENGTH:
+        return {'error': 'El código es demasiado largo (máximo 10KB)'}, 400
+    
+    # Filtros básicos de seguridad
+    pattern = find_dangerous_pattern(code)
+    if pattern is not None:
+        return {
+            'error': f'Código bloqueado: contiene patrón peligroso "{pattern}"',
+            'security_note': 'El código fue bloqueado por razones de seguridad'
+        }, 400
+    return None
+
+@sandbox_bp.before_request
+def limit_body_size():
+    """Rechaza cuerpos demasiado grandes antes de leerlos o parsear el JSON"""
+    # También acota los cuerpos sin Content-Length (chunked) al leerlos
+    request.max_content_length = SANDBOX_MAX_BODY
+    if request.content_length is not None and request.content_length > SANDBOX_MAX_BODY:
+        return jsonify({'error': f'Petición demasiado grande (máximo {SANDBOX_MAX_BODY // 1024}KB)'}), 413
+
+def _parse_execute_request() -> Tuple[Optional[Tuple[str, str, str]], Optional[Tuple[Dict[str, Any], int]]]:
+    """(código, lenguaje, entrada) validados de una petición de ejecución, o su error"""
+    data = _load_json_body()
+    
+    error = _validate_execute_payload(data)
+    if error:
+        return None, ({'error': error}, 400)
+    
+    code = (data.get('code') or '').strip()
+    language = (data.get('language') or '').lower()
+    input_data = data.get('input') or ''
+    
+    error = _validate_execute(code, language)
+    if error:
+        return None, error
+    return (code, language, input_data), None
+
 @sandbox_bp.route('/execute', methods=['POST'])
 @cross_origin()
 def execute_code():
     """Ejecutar código en sandbox"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No se proporcionaron datos'}), 400
-        
-        code = data.get('code', '').strip()
-        language = data.get('language', '').lower()
-        input_data = data.get('input', '')
-        
-        if not code:
-            return jsonify({'error': 'El código no puede estar vacío'}), 400
-        
-        if not language:
-            return jsonify({'error': 'Debe especificar un lenguaje'}), 400
-        
-        # Validar longitud del código
-        if len(code) > 10000:  # 10KB máximo
-            return jsonify({'error': 'El código es demasiado largo (máximo 10KB)'}), 400
-        
-        # Filtros básicos de seguridad
-        dangerous_patterns = [
-            'import os', 'import subprocess', 'import sys',
-            'eval(', 'exec(', '__import__',
-            'open(', 'file(', 'input(',
-            'raw_input(', 'compile(',
-            'rm -rf', 'sudo', 'wget', 'curl'
-        ]
-        
-        code_lower = code.lower()
-        for pattern in dangerous_patterns:
-            if pattern in code_lower:
-                return jsonify({
-                    'error': f'Código bloqueado: contiene patrón peligroso "{pattern}"',
-                    'security_note': 'El código fue bloqueado por razones de seguridad'
-                }), 400
+        fields, error = _parse_execute_request()
+        if error:
+            return error
+        code, language, input_data = fields
         
         # Ejecutar código
         result = code_sandbox.execute_code(code, language, input_data)
         
-        return jsonify(result)
+        # Sin hueco libre a tiempo: el cliente puede reintentar
+        return jsonify(result), 503 if result.get('busy') else 200
     
     except Exception as e:
         return jsonify({
@@ -282,15 +780,39 @@ def execute_code():
             'error': f'Error interno: {str(e)}'
         }), 500
 
+@sandbox_bp.route('/execute/stream', methods=['POST'])
+@cross_origin()
+def execute_code_stream():
+    """Ejecutar código en sandbox enviando la salida en NDJSON a medida que se produce"""
+    try:
+        fields, error = _parse_execute_request()
+        if error:
+            return error
+        
+        return Response(
+            code_sandbox.stream_code(*fields),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno: {str(e)}'
+        }), 500
+
+# La tabla de lenguajes no cambia en ejecución: solo se añade docker_available al final
+_LANGUAGES_PREFIX = orjson.dumps({
+    'languages': list(_LANGUAGE_NAMES),
+    'configurations': _LANGUAGE_CONFIGURATIONS
+})[:-1]
+
 @sandbox_bp.route('/languages', methods=['GET'])
 @cross_origin()
 def get_supported_languages():
     """Obtener lenguajes soportados"""
-    return jsonify({
-        'languages': list(code_sandbox.SUPPORTED_LANGUAGES.keys()),
-        'docker_available': code_sandbox.docker_available,
-        'configurations': code_sandbox.SUPPORTED_LANGUAGES
-    })
+    docker_flag = b'true' if code_sandbox.docker_available else b'false'
+    return json_response(_LANGUAGES_PREFIX + b',"docker_available":' + docker_flag + b'}')
 
 @sandbox_bp.route('/health', methods=['GET'])
 @cross_origin()
@@ -299,15 +821,14 @@ def sandbox_health():
     return jsonify({
         'status': 'healthy',
         'docker_available': code_sandbox.docker_available,
-        'supported_languages': list(code_sandbox.SUPPORTED_LANGUAGES.keys())
-    })
+        'supported_languages': list(_LANGUAGE_NAMES),
+        'in_flight': code_sandbox.in_flight,
+        'max_concurrent': SANDBOX_MAX_CONCURRENT
+    }), 200
 
-@sandbox_bp.route('/examples', methods=['GET'])
-@cross_origin()
-def get_code_examples():
-    """Obtener ejemplos de código para cada lenguaje"""
-    examples = {
-        'python': '''# Ejemplo Python
+# Ejemplos de código por lenguaje, serializados una sola vez
+_EXAMPLES_JSON = orjson.dumps({'examples': {
+    'python': '''# Ejemplo Python
 print("¡Hola desde el sandbox!")
 
 # Operaciones básicas
@@ -324,7 +845,7 @@ def fibonacci(n):
 
 print(f"Fibonacci de 8: {fibonacci(8)}")
 ''',
-        'javascript': '''// Ejemplo JavaScript
+    'javascript': '''// Ejemplo JavaScript
 console.log("¡Hola desde el sandbox!");
 
 // Operaciones básicas
@@ -341,7 +862,7 @@ function fibonacci(n) {
 
 console.log(`Fibonacci de 8: ${fibonacci(8)}`);
 ''',
-        'bash': '''#!/bin/bash
+    'bash': '''#!/bin/bash
 # Ejemplo Bash
 echo "¡Hola desde el sandbox!"
 
@@ -358,6 +879,11 @@ done
 # Fecha actual
 echo "Fecha actual: $(date)"
 '''
-    }
-    
-    return jsonify({'examples': examples})
+}})
+
+@sandbox_bp.route('/examples', methods=['GET'])
+@cross_origin()
+def get_code_examples():
+    """Obtener ejemplos de código para cada lenguaje"""
+    # Se crea un Response nuevo en cada petición: CORS modifica sus cabeceras
+    return json_response(_EXAMPLES_JSON)
@@ -1,14 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
-import json
 import time
 import logging
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
+from src.utils.clock import now_iso
 import threading
 import queue
 import random
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 self_repair_bp = Blueprint('self_repair', __name__)
 
@@ -16,15 +18,95 @@ self_repair_bp = Blueprint('self_repair', __name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Mediciones que se conservan por métrica (ventana deslizante)
+METRICS_WINDOW = 100
+# Métricas de peticiones encoladas a partir de las cuales las agrega el propio
+# productor, para que la cola no crezca si nadie lee las métricas
+METRICS_DRAIN_SIZE = 1000
+# Segundos entre muestras del sistema mientras el monitoreo está activo
+MONITOR_INTERVAL = 10
+# Reparaciones que se conservan en el historial (y consultables por id)
+REPAIR_HISTORY_SIZE = 1000
+# Hilos que ejecutan las reparaciones en segundo plano
+REPAIR_WORKERS = 8
+# Duración simulada de cada paso de una reparación
+REPAIR_STEP_DELAY = 0.5
+
+# Las reparaciones no bloquean el worker HTTP: se ejecutan aquí y se consultan por id
+_REPAIR_POOL = ThreadPoolExecutor(max_workers=REPAIR_WORKERS, thread_name_prefix='repair')
+
+# Comprobaciones de detect_anomalies: (métrica, umbral, tipo de anomalía, severidad,
+# valor a partir del cual la severidad pasa a 'high' o None, descripción)
+_ANOMALY_CHECKS = (
+    ('cpu_usage', 'max_cpu_usage', 'high_cpu_usage', 'medium', 90,
+     'Uso de CPU ({value:.1f}%) excede el umbral'),
+    ('memory_usage', 'max_memory_usage', 'high_memory_usage', 'medium', 95,
+     'Uso de memoria ({value:.1f}%) excede el umbral'),
+    ('disk_usage', 'max_disk_usage', 'high_disk_usage', 'high', None,
+     'Uso de disco ({value:.1f}%) excede el umbral'),
+    ('avg_response_time', 'max_response_time', 'high_response_time', 'medium', None,
+     'Tiempo de respuesta promedio ({value:.2f}s) excede el umbral'),
+    ('error_rate', 'max_error_rate', 'high_error_rate', 'high', None,
+     'Tasa de errores ({value:.2%}) excede el umbral'),
+)
+
+# Pasos (simulados) de cada acción de reparación
+_EXECUTION_STEPS = {
+    'restart_high_cpu_processes': (
+        'Identificar procesos con alto uso de CPU',
+        'Verificar criticidad de procesos',
+        'Reiniciar procesos no críticos',
+        'Monitorear uso de CPU post-reinicio'
+    ),
+    'clear_memory_cache': (
+        'Verificar uso actual de memoria',
+        'Limpiar caché del sistema',
+        'Liberar memoria no utilizada',
+        'Verificar mejora en uso de memoria'
+    ),
+    'clean_temporary_files': (
+        'Identificar archivos temporales',
+        'Verificar seguridad de eliminación',
+        'Eliminar archivos temporales',
+        'Verificar espacio liberado'
+    ),
+    'optimize_database_queries': (
+        'Analizar consultas lentas',
+        'Identificar oportunidades de optimización',
+        'Aplicar optimizaciones',
+        'Verificar mejora en rendimiento'
+    ),
+    'check_application_logs': (
+        'Acceder a logs de aplicación',
+        'Buscar patrones de error',
+        'Identificar causas raíz',
+        'Generar reporte de errores'
+    )
+}
+_DEFAULT_EXECUTION_STEPS = ('Ejecutar acción', 'Verificar resultado')
+
+# Plantillas de los pasos completados: en cada ejecución solo se añade la marca de tiempo
+def _step_templates(steps: Tuple[str, ...]) -> Tuple[Dict[str, str], ...]:
+    return tuple({'step': step, 'status': 'completed'} for step in steps)
+
+_STEP_TEMPLATES = {action: _step_templates(steps) for action, steps in _EXECUTION_STEPS.items()}
+_DEFAULT_STEP_TEMPLATES = _step_templates(_DEFAULT_EXECUTION_STEPS)
+
+class MetricSample(NamedTuple):
+    """Medición de una métrica: una tupla ocupa bastante menos que un dict por entrada"""
+    value: float
+    timestamp: str
+
 class SimpleSystemMonitor:
     """Monitor del sistema simplificado sin dependencias externas"""
     
     def __init__(self):
+        # deque acotado: al llenarse, cada append descarta la medición más antigua
         self.metrics = {
-            'cpu_usage': [],
-            'memory_usage': [],
-            'disk_usage': [],
-            'response_times': [],
+            'cpu_usage': deque(maxlen=METRICS_WINDOW),
+            'memory_usage': deque(maxlen=METRICS_WINDOW),
+            'disk_usage': deque(maxlen=METRICS_WINDOW),
+            'response_times': deque(maxlen=METRICS_WINDOW),
             'error_count': 0,
             'request_count': 0
         }
@@ -36,109 +118,121 @@ class SimpleSystemMonitor:
             'max_error_rate': 0.1
         }
         self.monitoring = False
-        self.monitor_thread = None
+        # Sin hilo de fondo: con el monitoreo activo, la muestra se toma al consultar las
+        # métricas si la última tiene más de MONITOR_INTERVAL segundos
+        self._last_sample_at = None
+        self._sample_lock = threading.Lock()
+        # Suma de la ventana de tiempos de respuesta: el promedio no la recorre entera.
+        # El lock protege la ventana, la suma y los contadores
+        self._response_time_sum = 0.0
+        self._requests_lock = threading.Lock()
+        # Las peticiones solo encolan su métrica; se agregan al leer las métricas
+        self._pending_requests = queue.SimpleQueue()
     
     def start_monitoring(self):
         """Inicia el monitoreo del sistema"""
         self.monitoring = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
         logger.info("Monitoreo del sistema iniciado")
     
     def stop_monitoring(self):
         """Detiene el monitoreo del sistema"""
         self.monitoring = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=1)
         logger.info("Monitoreo del sistema detenido")
     
-    def _monitor_loop(self):
-        """Bucle principal de monitoreo con métricas simuladas"""
-        while self.monitoring:
-            try:
-                # Simular métricas del sistema
-                cpu_percent = random.uniform(10, 70)  # CPU entre 10-70%
-                memory_percent = random.uniform(20, 60)  # Memoria entre 20-60%
-                disk_percent = random.uniform(15, 50)  # Disco entre 15-50%
-                
-                # Almacenar métricas
-                self.metrics['cpu_usage'].append({
-                    'value': cpu_percent,
-                    'timestamp': datetime.now().isoformat()
-                })
-                self.metrics['memory_usage'].append({
-                    'value': memory_percent,
-                    'timestamp': datetime.now().isoformat()
-                })
-                self.metrics['disk_usage'].append({
-                    'value': disk_percent,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-                # Mantener solo las últimas 100 mediciones
-                for metric_type in ['cpu_usage', 'memory_usage', 'disk_usage']:
-                    if len(self.metrics[metric_type]) > 100:
-                        self.metrics[metric_type] = self.metrics[metric_type][-100:]
-                
-                time.sleep(10)  # Monitorear cada 10 segundos
-                
-            except Exception as e:
-                logger.error(f"Error en monitoreo: {str(e)}")
-                time.sleep(5)
+    def _sample_if_due(self):
+        """Toma una muestra de métricas simuladas si el monitoreo está activo y toca"""
+        if not self.monitoring:
+            return
+        with self._sample_lock:
+            now = time.monotonic()
+            if self._last_sample_at is not None and now - self._last_sample_at < MONITOR_INTERVAL:
+                return
+            self._last_sample_at = now
+            
+            # Simular métricas del sistema
+            cpu_percent = random.uniform(10, 70)  # CPU entre 10-70%
+            memory_percent = random.uniform(20, 60)  # Memoria entre 20-60%
+            disk_percent = random.uniform(15, 50)  # Disco entre 15-50%
+            
+            # Almacenar métricas
+            timestamp = now_iso()
+            self.metrics['cpu_usage'].append(MetricSample(cpu_percent, timestamp))
+            self.metrics['memory_usage'].append(MetricSample(memory_percent, timestamp))
+            self.metrics['disk_usage'].append(MetricSample(disk_percent, timestamp))
     
     def record_request_metric(self, response_time: float, is_error: bool = False):
         """Registra métricas de peticiones"""
-        self.metrics['response_times'].append({
-            'value': response_time,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        if len(self.metrics['response_times']) > 100:
-            self.metrics['response_times'] = self.metrics['response_times'][-100:]
-        
-        self.metrics['request_count'] += 1
-        if is_error:
-            self.metrics['error_count'] += 1
+        # Sin lock en el camino de la petición: SimpleQueue admite varios productores
+        self._pending_requests.put((response_time, is_error, now_iso()))
+        if self._pending_requests.qsize() >= METRICS_DRAIN_SIZE:
+            with self._requests_lock:
+                self._drain_pending_requests()
+    
+    def _drain_pending_requests(self):
+        """Agrega las métricas encoladas a la ventana y los contadores (con el lock tomado)"""
+        response_times = self.metrics['response_times']
+        while True:
+            try:
+                response_time, is_error, timestamp = self._pending_requests.get_nowait()
+            except queue.Empty:
+                return
+            
+            # Con la ventana llena, el append descarta la medición más antigua
+            if len(response_times) == response_times.maxlen:
+                self._response_time_sum -= response_times[0].value
+            response_times.append(MetricSample(response_time, timestamp))
+            self._response_time_sum += response_time
+            
+            self.metrics['request_count'] += 1
+            if is_error:
+                self.metrics['error_count'] += 1
     
     def get_current_metrics(self) -> Dict[str, Any]:
         """Obtiene las métricas actuales del sistema"""
         current_metrics = {}
+        self._sample_if_due()
         
         # CPU actual
         if self.metrics['cpu_usage']:
-            current_metrics['cpu_usage'] = self.metrics['cpu_usage'][-1]['value']
+            current_metrics['cpu_usage'] = self.metrics['cpu_usage'][-1].value
         else:
             current_metrics['cpu_usage'] = random.uniform(10, 50)
         
         # Memoria actual
         if self.metrics['memory_usage']:
-            current_metrics['memory_usage'] = self.metrics['memory_usage'][-1]['value']
+            current_metrics['memory_usage'] = self.metrics['memory_usage'][-1].value
         else:
             current_metrics['memory_usage'] = random.uniform(20, 60)
         
         # Disco actual
         if self.metrics['disk_usage']:
-            current_metrics['disk_usage'] = self.metrics['disk_usage'][-1]['value']
+            current_metrics['disk_usage'] = self.metrics['disk_usage'][-1].value
         else:
             current_metrics['disk_usage'] = random.uniform(15, 40)
         
         # Tiempo de respuesta promedio
-        if self.metrics['response_times']:
-            avg_response_time = sum(m['value'] for m in self.metrics['response_times']) / len(self.metrics['response_times'])
-            current_metrics['avg_response_time'] = avg_response_time
+        # Instantánea coherente de la ventana y los contadores
+        with self._requests_lock:
+            self._drain_pending_requests()
+            window_size = len(self.metrics['response_times'])
+            response_time_sum = self._response_time_sum
+            request_count = self.metrics['request_count']
+            error_count = self.metrics['error_count']
+        
+        if window_size:
+            current_metrics['avg_response_time'] = response_time_sum / window_size
         else:
             current_metrics['avg_response_time'] = random.uniform(0.1, 2.0)
         
         # Tasa de errores
-        if self.metrics['request_count'] > 0:
-            current_metrics['error_rate'] = self.metrics['error_count'] / self.metrics['request_count']
+        if request_count > 0:
+            current_metrics['error_rate'] = error_count / request_count
         else:
             current_metrics['error_rate'] = 0
         
-        current_metrics['total_requests'] = self.metrics['request_count']
-        current_metrics['total_errors'] = self.metrics['error_count']
-        current_metrics['timestamp'] = datetime.now().isoformat()
+        current_metrics['total_requests'] = request_count
+        current_metrics['total_errors'] = error_count
+        current_metrics['timestamp'] = now_iso()
         
         return current_metrics
     
@@ -147,60 +241,19 @@ class SimpleSystemMonitor:
         anomalies = []
         current_metrics = self.get_current_metrics()
         
-        # Verificar CPU
-        if current_metrics['cpu_usage'] > self.thresholds['max_cpu_usage']:
-            anomalies.append({
-                'type': 'high_cpu_usage',
-                'severity': 'high' if current_metrics['cpu_usage'] > 90 else 'medium',
-                'value': current_metrics['cpu_usage'],
-                'threshold': self.thresholds['max_cpu_usage'],
-                'description': f'Uso de CPU ({current_metrics["cpu_usage"]:.1f}%) excede el umbral',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Verificar memoria
-        if current_metrics['memory_usage'] > self.thresholds['max_memory_usage']:
-            anomalies.append({
-                'type': 'high_memory_usage',
-                'severity': 'high' if current_metrics['memory_usage'] > 95 else 'medium',
-                'value': current_metrics['memory_usage'],
-                'threshold': self.thresholds['max_memory_usage'],
-                'description': f'Uso de memoria ({current_metrics["memory_usage"]:.1f}%) excede el umbral',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Verificar disco
-        if current_metrics['disk_usage'] > self.thresholds['max_disk_usage']:
-            anomalies.append({
-                'type': 'high_disk_usage',
-                'severity': 'high',
-                'value': current_metrics['disk_usage'],
-                'threshold': self.thresholds['max_disk_usage'],
-                'description': f'Uso de disco ({current_metrics["disk_usage"]:.1f}%) excede el umbral',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Verificar tiempo de respuesta
-        if current_metrics['avg_response_time'] > self.thresholds['max_response_time']:
-            anomalies.append({
-                'type': 'high_response_time',
-                'severity': 'medium',
-                'value': current_metrics['avg_response_time'],
-                'threshold': self.thresholds['max_response_time'],
-                'description': f'Tiempo de respuesta promedio ({current_metrics["avg_response_time"]:.2f}s) excede el umbral',
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Verificar tasa de errores
-        if current_metrics['error_rate'] > self.thresholds['max_error_rate']:
-            anomalies.append({
-                'type': 'high_error_rate',
-                'severity': 'high',
-                'value': current_metrics['error_rate'],
-                'threshold': self.thresholds['max_error_rate'],
-                'description': f'Tasa de errores ({current_metrics["error_rate"]:.2%}) excede el umbral',
-                'timestamp': datetime.now().isoformat()
-            })
+        timestamp = now_iso()
+        for metric, threshold_key, anomaly_type, severity, high_above, description in _ANOMALY_CHECKS:
+            value = current_metrics[metric]
+            threshold = self.thresholds[threshold_key]
+            if value > threshold:
+                anomalies.append({
+                    'type': anomaly_type,
+                    'severity': 'high' if high_above is not None and value > high_above else severity,
+                    'value': value,
+                    'threshold': threshold,
+                    'description': description.format(value=value),
+                    'timestamp': timestamp
+                })
         
         return anomalies
 
@@ -280,14 +333,28 @@ class SimpleRepairEngine:
                 }
             ]
         }
-        self.repair_history = []
+        self.repair_history = deque(maxlen=REPAIR_HISTORY_SIZE)
+        # Ejecuciones por id para consultar su estado, acotadas como el historial
+        self._executions = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Las acciones no cambian: se ordenan por riesgo (bajo primero) y tiempo, y se
+        # suma su duración una sola vez por tipo de anomalía
+        self._sorted_actions = {
+            anomaly_type: sorted(actions, key=lambda x: (x['risk'] == 'high', x['estimated_time']))
+            for anomaly_type, actions in self.repair_actions.items()
+        }
+        self._total_times = {
+            anomaly_type: sum(action['estimated_time'] for action in actions)
+            for anomaly_type, actions in self._sorted_actions.items()
+        }
     
     def generate_repair_plan(self, anomaly: Dict[str, Any]) -> Dict[str, Any]:
         """Genera un plan de reparación para una anomalía"""
         anomaly_type = anomaly['type']
-        available_actions = self.repair_actions.get(anomaly_type, [])
+        sorted_actions = self._sorted_actions.get(anomaly_type)
         
-        if not available_actions:
+        if not sorted_actions:
             return {
                 'anomaly_id': f"anomaly_{int(time.time())}",
                 'type': anomaly_type,
@@ -296,95 +363,93 @@ class SimpleRepairEngine:
                 'message': f'No hay acciones de reparación disponibles para {anomaly_type}'
             }
         
-        # Priorizar acciones por riesgo (bajo primero) y tiempo
-        sorted_actions = sorted(available_actions, key=lambda x: (x['risk'] == 'high', x['estimated_time']))
-        
         repair_plan = {
             'anomaly_id': f"anomaly_{int(time.time())}",
             'type': anomaly_type,
             'severity': anomaly['severity'],
-            'actions': sorted_actions,
-            'recommended_action': sorted_actions[0] if sorted_actions else None,
-            'total_estimated_time': sum(action['estimated_time'] for action in sorted_actions),
-            'timestamp': datetime.now().isoformat(),
+            'actions': list(sorted_actions),
+            'recommended_action': sorted_actions[0],
+            'total_estimated_time': self._total_times[anomaly_type],
+            'timestamp': now_iso(),
             'status': 'plan_generated'
         }
         
         return repair_plan
     
     def execute_repair_action(self, action: Dict[str, Any], anomaly_type: str) -> Dict[str, Any]:
-        """Ejecuta una acción de reparación (simulado)"""
-        execution_id = f"exec_{int(time.time())}"
-        
-        logger.info(f"Ejecutando acción de reparación: {action['action']}")
+        """Ejecuta una acción de reparación (simulado) y espera a que termine"""
+        execution_result = self._register_execution(action, anomaly_type)
+        self._run_steps(execution_result)
+        return execution_result
+    
+    def submit_repair_action(self, action: Dict[str, Any], anomaly_type: str) -> Dict[str, Any]:
+        """Encola una acción de reparación y devuelve su estado inicial sin esperar"""
+        execution_result = self._register_execution(action, anomaly_type)
+        snapshot = dict(execution_result, steps=[])
+        _REPAIR_POOL.submit(self._run_steps, execution_result)
+        return snapshot
+    
+    def get_execution(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el estado de una ejecución, o None si no existe"""
+        with self._lock:
+            execution_result = self._executions.get(execution_id)
+            if execution_result is None:
+                return None
+            return dict(execution_result, steps=list(execution_result['steps']))
+    
+    def get_history(self) -> List[Dict[str, Any]]:
+        """Copia del historial: las reparaciones en curso lo modifican desde otros hilos"""
+        with self._lock:
+            return [dict(execution_result, steps=list(execution_result['steps']))
+                    for execution_result in self.repair_history]
+    
+    def _register_execution(self, action: Dict[str, Any], anomaly_type: str) -> Dict[str, Any]:
+        """Crea la ejecución en estado queued y la agrega al historial"""
+        # Sufijo aleatorio: varias reparaciones pueden empezar en el mismo segundo
+        execution_id = f"exec_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         
-        # Simular ejecución de la acción
         execution_result = {
             'execution_id': execution_id,
             'action': action['action'],
             'description': action['description'],
             'anomaly_type': anomaly_type,
-            'status': 'in_progress',
-            'start_time': datetime.now().isoformat(),
+            'status': 'queued',
+            'start_time': now_iso(),
             'steps': []
         }
         
+        with self._lock:
+            self.repair_history.append(execution_result)
+            self._executions[execution_id] = execution_result
+            while len(self._executions) > REPAIR_HISTORY_SIZE:
+                self._executions.popitem(last=False)
+        return execution_result
+    
+    def _run_steps(self, execution_result: Dict[str, Any]):
+        """Ejecuta los pasos (simulados) de una reparación y actualiza su estado"""
+        action = execution_result['action']
+        logger.info(f"Ejecutando acción de reparación: {action}")
+        with self._lock:
+            execution_result['status'] = 'in_progress'
+        
         # Simular pasos de ejecución
-        steps = self._get_execution_steps(action['action'])
-        for step in steps:
-            time.sleep(0.5)  # Simular tiempo de ejecución más rápido
-            execution_result['steps'].append({
-                'step': step,
+        for template in self._get_execution_steps(action):
+            time.sleep(REPAIR_STEP_DELAY)
+            with self._lock:
+                execution_result['steps'].append(dict(template, timestamp=now_iso()))
+            logger.info(f"Paso completado: {template['step']}")
+        
+        with self._lock:
+            execution_result.update({
                 'status': 'completed',
-                'timestamp': datetime.now().isoformat()
+                'end_time': now_iso(),
+                'success': True,
+                'message': f'Acción {action} ejecutada exitosamente'
             })
-            logger.info(f"Paso completado: {step}")
-        
-        execution_result['status'] = 'completed'
-        execution_result['end_time'] = datetime.now().isoformat()
-        execution_result['success'] = True
-        execution_result['message'] = f'Acción {action["action"]} ejecutada exitosamente'
-        
-        self.repair_history.append(execution_result)
-        
-        return execution_result
     
-    def _get_execution_steps(self, action: str) -> List[str]:
-        """Obtiene los pasos de ejecución para una acción"""
-        steps_map = {
-            'restart_high_cpu_processes': [
-                'Identificar procesos con alto uso de CPU',
-                'Verificar criticidad de procesos',
-                'Reiniciar procesos no críticos',
-                'Monitorear uso de CPU post-reinicio'
-            ],
-            'clear_memory_cache': [
-                'Verificar uso actual de memoria',
-                'Limpiar caché del sistema',
-                'Liberar memoria no utilizada',
-                'Verificar mejora en uso de memoria'
-            ],
-            'clean_temporary_files': [
-                'Identificar archivos temporales',
-                'Verificar seguridad de eliminación',
-                'Eliminar archivos temporales',
-                'Verificar espacio liberado'
-            ],
-            'optimize_database_queries': [
-                'Analizar consultas lentas',
-                'Identificar oportunidades de optimización',
-                'Aplicar optimizaciones',
-                'Verificar mejora en rendimiento'
-            ],
-            'check_application_logs': [
-                'Acceder a logs de aplicación',
-                'Buscar patrones de error',
-                'Identificar causas raíz',
-                'Generar reporte de errores'
-            ]
-        }
-        
-        return steps_map.get(action, ['Ejecutar acción', 'Verificar resultado'])
+    def _get_execution_steps(self, action: str) -> Tuple[Dict[str, str], ...]:
+        """Obtiene las plantillas de los pasos de ejecución de una acción"""
+        return _STEP_TEMPLATES.get(action, _DEFAULT_STEP_TEMPLATES)
 
 # Instancias globales
 system_monitor = SimpleSystemMonitor()
@@ -399,7 +464,7 @@ def start_monitoring():
         return jsonify({
             'status': 'success',
             'message': 'Monitoreo del sistema iniciado',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         }), 200
     except Exception as e:
         return jsonify({'error': f'Error iniciando monitoreo: {str(e)}'}), 500
@@ -413,7 +478,7 @@ def stop_monitoring():
         return jsonify({
             'status': 'success',
             'message': 'Monitoreo del sistema detenido',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         }), 200
     except Exception as e:
         return jsonify({'error': f'Error deteniendo monitoreo: {str(e)}'}), 500
@@ -437,7 +502,7 @@ def detect_anomalies():
         return jsonify({
             'anomalies': anomalies,
             'count': len(anomalies),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'status': 'success'
         }), 200
     except Exception as e:
@@ -471,20 +536,34 @@ def execute_repair():
         if not action or not anomaly_type:
             return jsonify({'error': 'Acción y tipo de anomalía requeridos'}), 400
         
-        result = repair_engine.execute_repair_action(action, anomaly_type)
-        return jsonify(result), 200
+        # La reparación sigue en segundo plano; el cliente consulta GET /execute-repair/<execution_id>
+        result = repair_engine.submit_repair_action(action, anomaly_type)
+        return jsonify(result), 202
     except Exception as e:
         return jsonify({'error': f'Error ejecutando reparación: {str(e)}'}), 500
 
+@self_repair_bp.route('/execute-repair/<execution_id>', methods=['GET'])
+@cross_origin()
+def get_repair_status(execution_id):
+    """Obtiene el estado de una reparación en curso o terminada"""
+    try:
+        result = repair_engine.get_execution(execution_id)
+        if result is None:
+            return jsonify({'error': 'Reparación no encontrada'}), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo reparación: {str(e)}'}), 500
+
 @self_repair_bp.route('/repair-history', methods=['GET'])
 @cross_origin()
 def get_repair_history():
     """Obtiene el historial de reparaciones"""
     try:
+        history = repair_engine.get_history()
         return jsonify({
-            'history': repair_engine.repair_history,
-            'count': len(repair_engine.repair_history),
-            'timestamp': datetime.now().isoformat(),
+            'history': history,
+            'count': len(history),
+            'timestamp': now_iso(),
             'status': 'success'
         }), 200
     except Exception as e:
@@ -504,7 +583,7 @@ def auto_repair():
                 'message': 'No se detectaron anomalías',
                 'anomalies_detected': 0,
                 'repairs_executed': 0,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now_iso()
             }), 200
         
         repair_results = []
@@ -514,8 +593,8 @@ def auto_repair():
             repair_plan = repair_engine.generate_repair_plan(anomaly)
             
             if repair_plan['recommended_action']:
-                # Ejecutar acción recomendada
-                execution_result = repair_engine.execute_repair_action(
+                # Encolar la acción recomendada: todas las reparaciones avanzan en paralelo
+                execution_result = repair_engine.submit_repair_action(
                     repair_plan['recommended_action'],
                     anomaly['type']
                 )
@@ -528,11 +607,11 @@ def auto_repair():
         
         return jsonify({
             'status': 'success',
-            'message': f'Ciclo de auto-reparación completado',
+            'message': f'Ciclo de auto-reparación iniciado',
             'anomalies_detected': len(anomalies),
             'repairs_executed': len(repair_results),
             'results': repair_results,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         }), 200
         
     except Exception as e:
@@ -2,20 +2,36 @@
 Utilidades de autenticación y seguridad
 """
 import jwt
+import time
 import bcrypt
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
+
+# Tokens ya verificados: token -> (exp, secreto, payload). Un token repetido no vuelve a
+# pasar por HMAC-SHA256 hasta que expira; LRU acotado a TOKEN_CACHE_SIZE entradas
+TOKEN_CACHE_SIZE = 4096
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
 
 def hash_password(password: str) -> str:
-    """Hash de contraseña usando bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash de contraseña usando bcrypt (como str, para almacenarlo)"""
+    return hash_password_bytes(password.encode('utf-8')).decode('utf-8')
+
+def hash_password_bytes(password: bytes) -> bytes:
+    """Hash de contraseña usando bcrypt sin conversiones a str"""
+    return bcrypt.hashpw(password, bcrypt.gensalt())
 
-def check_password(password: str, hashed: str) -> bool:
-    """Verificar contraseña contra hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def check_password(password: Union[str, bytes], hashed: Union[str, bytes]) -> bool:
+    """Verificar contraseña contra hash; acepta str o bytes en ambos argumentos"""
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
+    return bcrypt.checkpw(password, hashed)
 
 def generate_token(user_id: int, token_type: str = 'access') -> str:
     """Generar JWT token"""
@@ -39,19 +55,52 @@ def generate_token(user_id: int, token_type: str = 'access') -> str:
         algorithm='HS256'
     )
 
+def authenticate_password(user_id: int, password: str, hashed: str) -> Optional[Dict[str, str]]:
+    """Verificar la contraseña una sola vez y emitir los tokens de la sesión
+
+    bcrypt es lento a propósito: las peticiones siguientes se autentican con el token
+    de acceso (require_auth) en lugar de volver a verificar la contraseña.
+    """
+    if not check_password(password, hashed):
+        return None
+    return {
+        'access_token': generate_token(user_id, 'access'),
+        'refresh_token': generate_token(user_id, 'refresh')
+    }
+
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """Decodificar JWT token"""
+    secret = current_app.config['JWT_SECRET_KEY']
+    now = time.time()
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is not None:
+            expires, cached_secret, payload = entry
+            # Si la clave rota, los tokens verificados con la anterior no valen
+            if expires > now and cached_secret == secret:
+                _token_cache.move_to_end(token)
+                return dict(payload)
+            del _token_cache[token]
+    
     try:
         payload = jwt.decode(
             token, 
-            current_app.config['JWT_SECRET_KEY'], 
+            secret, 
             algorithms=['HS256']
         )
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    expires = payload.get('exp')
+    if isinstance(expires, (int, float)):
+        with _token_cache_lock:
+            _token_cache[token] = (expires, secret, payload)
+            _token_cache.move_to_end(token)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return dict(payload)
 
 def require_auth(f):
     """Decorador para rutas que requieren autenticación"""
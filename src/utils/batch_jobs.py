@@ -0,0 +1,131 @@
+"""
+Cola de trabajos diferidos sobre la Batch API de OpenAI
+"""
+import io
+import json
+import uuid
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from src.utils.cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_COMPLETION_WINDOW = '24h'
+# Los resultados de la Batch API pueden tardar hasta 24h; se conservan una semana
+JOB_TTL = 604800
+FINISHED_BATCH_STATES = ('failed', 'expired', 'cancelled')
+
+class BatchQueue:
+    """Acumula peticiones de chat completions y las envía en lotes a la Batch API"""
+
+    def __init__(self, client_factory: Callable[[], Any], redis_url: Optional[str] = None,
+                 flush_interval: float = 30.0, flush_size: int = 50):
+        self.client_factory = client_factory
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        # Estado de cada trabajo (custom_id -> estado/lote/resultado)
+        self.jobs = ResponseCache(redis_url, prefix='batch:job', ttl=JOB_TTL, max_entries=10000)
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def submit(self, body: Dict[str, Any], metadata: Dict[str, Any] = None) -> str:
+        """Encola una petición y devuelve su job_id"""
+        job_id = uuid.uuid4().hex
+        self.jobs.set(job_id, {'status': 'queued', 'metadata': metadata or {}})
+
+        with self._lock:
+            self._buffer.append({
+                'custom_id': job_id,
+                'method': 'POST',
+                'url': BATCH_ENDPOINT,
+                'body': body
+            })
+            flush_now = len(self._buffer) >= self.flush_size
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+        return job_id
+
+    def flush(self):
+        """Sube el buffer como archivo JSONL y crea el lote"""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return
+
+        try:
+            client = self.client_factory()
+            if not client:
+                raise RuntimeError('OpenAI API key no configurada')
+
+            payload = '\n'.join(json.dumps(line) for line in pending).encode('utf-8')
+            input_file = client.files.create(file=('batch.jsonl', io.BytesIO(payload)), purpose='batch')
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=BATCH_COMPLETION_WINDOW
+            )
+            state = {'status': 'processing', 'batch_id': batch.id}
+            logger.info("Lote %s enviado con %d peticiones", batch.id, len(pending))
+        except Exception as e:
+            logger.warning("No se pudo enviar el lote: %s", e)
+            state = {'status': 'error', 'error': str(e)}
+
+        for line in pending:
+            job = self.jobs.get(line['custom_id']) or {}
+            job.update(state)
+            self.jobs.set(line['custom_id'], job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el estado de un trabajo, consultando el lote si aún está en proceso"""
+        job = self.jobs.get(job_id)
+        if job is None or job['status'] != 'processing':
+            return job
+
+        client = self.client_factory()
+        if not client:
+            return job
+
+        batch = client.batches.retrieve(job['batch_id'])
+        if batch.status == 'completed':
+            self._store_results(client, batch)
+            return self.jobs.get(job_id)
+        if batch.status in FINISHED_BATCH_STATES:
+            job.update({'status': 'error', 'error': f'Lote {batch.status}'})
+            self.jobs.set(job_id, job)
+        return job
+
+    def _store_results(self, client, batch):
+        """Lee el archivo de salida del lote y guarda el resultado de cada trabajo"""
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for raw in client.files.content(file_id).text.splitlines():
+                    if raw.strip():
+                        line = json.loads(raw)
+                        results[line['custom_id']] = line
+
+        for custom_id, line in results.items():
+            job = self.jobs.get(custom_id) or {}
+            response = line.get('response') or {}
+            if response.get('status_code') == 200:
+                job.update({
+                    'status': 'completed',
+                    'content': response['body']['choices'][0]['message']['content']
+                })
+            else:
+                error = line.get('error') or response.get('body', {}).get('error')
+                job.update({'status': 'error', 'error': str(error)})
+            self.jobs.set(custom_id, job)
@@ -0,0 +1,76 @@
+"""
+Utilidades de caché (Redis con fallback en memoria)
+"""
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+_redis_clients = {}
+
+def get_redis_client(redis_url: Optional[str]):
+    """Obtiene un cliente Redis compartido, o None si no está configurado o no responde"""
+    if not redis_url or redis is None:
+        return None
+    if redis_url not in _redis_clients:
+        try:
+            client = redis.Redis.from_url(redis_url, socket_connect_timeout=1, socket_timeout=2)
+            client.ping()
+        except Exception:
+            client = None
+        _redis_clients[redis_url] = client
+    return _redis_clients[redis_url]
+
+def hash_key(*parts: str) -> str:
+    """Genera una clave SHA-256 estable a partir de varias partes"""
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Caché de respuestas JSON con expiración, en Redis o en memoria"""
+
+    def __init__(self, redis_url: Optional[str] = None, prefix: str = 'cache', ttl: int = 86400,
+                 max_entries: int = 1024):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._redis = get_redis_client(redis_url)
+
+        # Fallback en memoria: LRU acotado con expiración por entrada
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Obtiene un valor cacheado o None si no existe o expiró"""
+        if self._redis is not None:
+            raw = self._redis.get(f"{self.prefix}:{key}")
+            return json.loads(raw) if raw else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Guarda un valor con el TTL configurado"""
+        if self._redis is not None:
+            self._redis.setex(f"{self.prefix}:{key}", self.ttl, json.dumps(value))
+            return
+
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
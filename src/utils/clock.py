@@ -0,0 +1,16 @@
+"""
+Marcas de tiempo compartidas por las rutas
+"""
+import time
+from datetime import datetime
+
+# Las marcas de tiempo de respuestas y registros tienen resolución de un segundo,
+# así que la cadena se reutiliza mientras no cambie el segundo del reloj
+_iso_cache = ['', -1]
+
+def now_iso() -> str:
+    """Fecha actual en ISO (precisión de segundos), recalculada solo cuando cambia el segundo"""
+    second = int(time.time())
+    if second != _iso_cache[1]:
+        _iso_cache[:] = [datetime.fromtimestamp(second).isoformat(timespec='seconds'), second]
+    return _iso_cache[0]
@@ -0,0 +1,175 @@
+"""
+Pool de contenedores Docker precalentados para el sandbox
+"""
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Los contenedores en espera terminan solos pasado este tiempo (auto_remove), de modo
+# que los que deja un worker caído no se acumulan en el host
+CONTAINER_TTL = 3600
+# Los que ejecutan un `command` propio no usan auto_remove; los detenidos con más de
+# esta antigüedad ya no puede estar usándolos nadie y se eliminan al arrancar el pool
+STOPPED_CONTAINER_AGE = 2 * CONTAINER_TTL
+# Margen para no entregar un contenedor a punto de expirar
+CONTAINER_TTL_MARGIN = 60
+
+class WarmContainerPool:
+    """Mantiene contenedores ya arrancados (`sleep`) por lenguaje para ejecutar con exec
+
+    Cada contenedor atiende una sola ejecución y después se destruye: reutilizarlo
+    dejaría procesos o archivos de una ejecución al alcance de la siguiente. Lo que se
+    ahorra es el arranque del contenedor, que pasa a hacerse en segundo plano.
+
+    Si `run_options` incluye `command`, el contenedor ejecuta ese proceso (por ejemplo un
+    intérprete ya arrancado que espera el código por stdin) en lugar de `sleep`, también
+    acotado a CONTAINER_TTL. Esos contenedores no se crean con auto_remove: quien los usa
+    necesita consultar su código de salida después de que terminen.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], run_options: Callable[[str], Dict[str, Any]],
+                 languages, size: int = 2, claim_timeout: float = 1.0):
+        self.client_factory = client_factory
+        self.run_options = run_options
+        self.languages = tuple(languages)
+        self.size = size
+        self.claim_timeout = claim_timeout
+
+        # language -> cola de (contenedor, instante de creación)
+        self._idle = {language: queue.Queue() for language in self.languages}
+        # Trabajo de fondo: ('pull' | 'start', language), ('discard', contenedor) o ('prune', None)
+        self._tasks = queue.Queue()
+        self._worker = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Arranca el hilo de fondo y llena el pool; es idempotente por proceso"""
+        with self._lock:
+            pid = os.getpid()
+            if self._pid == pid and self._worker is not None and self._worker.is_alive():
+                return
+            if self._pid != pid:
+                # Tras un fork las colas heredadas apuntan a contenedores del proceso padre
+                self._idle = {language: queue.Queue() for language in self.languages}
+                self._tasks = queue.Queue()
+                self._pid = pid
+                atexit.register(self.drain)
+                self._tasks.put(('prune', None))
+                # Descargar primero las imágenes que falten: así ninguna petición paga
+                # la descarga al arrancar un contenedor bajo demanda
+                for language in self.languages:
+                    self._tasks.put(('pull', language))
+                for language in self.languages:
+                    for _ in range(self.size):
+                        self._tasks.put(('start', language))
+            self._worker = threading.Thread(target=self._run, name='sandbox-pool', daemon=True)
+            self._worker.start()
+
+    def claim(self, language: str):
+        """Entrega un contenedor listo para `language`; si no hay ninguno, arranca uno"""
+        self.start()
+        deadline = time.monotonic() + self.claim_timeout
+        while True:
+            try:
+                container, created_at = self._idle[language].get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                container = self._start_container(language)
+                break
+            if created_at + CONTAINER_TTL - CONTAINER_TTL_MARGIN > time.monotonic():
+                break
+            self._tasks.put(('discard', container))
+
+        # Reponer el hueco que deja este contenedor
+        self._tasks.put(('start', language))
+        return container
+
+    def discard(self, container):
+        """Destruye en segundo plano un contenedor ya usado"""
+        self._tasks.put(('discard', container))
+
+    def drain(self):
+        """Destruye los contenedores en espera (al salir del proceso)"""
+        if self._pid != os.getpid():
+            return
+        for idle in self._idle.values():
+            while True:
+                try:
+                    container, _ = idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._kill(container)
+
+    def idle_count(self) -> Dict[str, int]:
+        """Contenedores en espera por lenguaje"""
+        return {language: idle.qsize() for language, idle in self._idle.items()}
+
+    def _start_container(self, language: str):
+        options = dict(self.run_options(language))
+        command = options.pop('command', None)
+        options.update(
+            command=['timeout', '-s', 'KILL', str(CONTAINER_TTL), *command] if command else ['sleep', str(CONTAINER_TTL)],
+            detach=True,
+            auto_remove=not command,
+            labels={'sandbox.pool': language}
+        )
+        image = options.pop('image')
+        return self.client_factory().containers.run(image, **options)
+
+    def _pull_image(self, language: str):
+        image = self.run_options(language)['image']
+        try:
+            client = self.client_factory()
+            try:
+                client.images.get(image)
+            except Exception:
+                logger.info("Descargando imagen %s para el sandbox", image)
+                client.images.pull(image)
+        except Exception as e:
+            logger.warning("No se pudo descargar la imagen %s: %s", image, e)
+
+    def _prune_stopped(self):
+        # Contenedores detenidos sin auto_remove que dejó un worker caído
+        try:
+            self.client_factory().containers.prune(
+                filters={'label': 'sandbox.pool', 'until': f'{STOPPED_CONTAINER_AGE}s'}
+            )
+        except Exception as e:
+            logger.debug("No se pudieron eliminar los contenedores detenidos: %s", e)
+
+    @staticmethod
+    def _kill(container):
+        # Con auto_remove basta con matarlo, pero los que no lo usan hay que borrarlos
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            logger.debug("No se pudo destruir el contenedor %s: %s", getattr(container, 'id', '?'), e)
+
+    def _run(self):
+        while True:
+            action, target = self._tasks.get()
+            if action == 'discard':
+                self._kill(target)
+                continue
+            if action == 'pull':
+                self._pull_image(target)
+                continue
+            if action == 'prune':
+                self._prune_stopped()
+                continue
+
+            if self._idle[target].qsize() >= self.size:
+                continue
+            try:
+                container = self._start_container(target)
+            except Exception as e:
+                # Se reintenta en la próxima reclamación; no se insiste en bucle
+                logger.warning("No se pudo precalentar un contenedor de %s: %s", target, e)
+                continue
+            self._idle[target].put((container, time.monotonic()))
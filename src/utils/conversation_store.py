@@ -0,0 +1,111 @@
+"""
+Almacenamiento del historial de conversaciones
+"""
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
+from src.utils.cache import get_redis_client
+
+# Seis meses de retención para las sesiones persistidas en Redis
+DEFAULT_TTL = 15_552_000
+DEFAULT_MAX_MESSAGES = 20
+# Límites del fallback en memoria: sesiones inactivas más de una hora se descartan
+DEFAULT_MAX_SESSIONS = 10_000
+DEFAULT_IDLE_TTL = 3600
+
+class ConversationStore:
+    """Historial de conversaciones respaldado por Redis con fallback en memoria"""
+
+    def __init__(self, redis_url: Optional[str] = None, max_messages: int = DEFAULT_MAX_MESSAGES,
+                 ttl: int = DEFAULT_TTL, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 idle_ttl: int = DEFAULT_IDLE_TTL):
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._redis = get_redis_client(redis_url)
+
+        # Fallback en memoria cuando Redis no está disponible: LRU de sesiones ordenado
+        # por último acceso, con un deque acotado de mensajes por sesión
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        """Nombre del backend en uso"""
+        return 'redis' if self._redis is not None else 'memory'
+
+    @staticmethod
+    def _messages_key(session_id: str) -> str:
+        return f"conv:{session_id}"
+
+    @staticmethod
+    def _memory_key(session_id: str) -> str:
+        return f"conv:{session_id}:memory"
+
+    def _session(self, session_id: str, create: bool = False) -> Optional[Dict[str, Any]]:
+        """Obtiene (o crea) una sesión en memoria y descarta las inactivas o sobrantes"""
+        with self._lock:
+            now = time.time()
+            session = self._sessions.get(session_id)
+            if session is not None and session['accessed_at'] + self.idle_ttl < now:
+                del self._sessions[session_id]
+                session = None
+
+            if session is None:
+                if not create:
+                    return None
+                session = {'messages': deque(maxlen=self.max_messages), 'memory': None}
+                self._sessions[session_id] = session
+            session['accessed_at'] = now
+            self._sessions.move_to_end(session_id)
+
+            # Las sesiones más antiguas quedan al principio del OrderedDict
+            while len(self._sessions) > 1:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if len(self._sessions) <= self.max_sessions and oldest['accessed_at'] + self.idle_ttl >= now:
+                    break
+                del self._sessions[oldest_id]
+            return session
+
+    def get_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Obtiene los mensajes de una sesión (los últimos `limit` si se indica)"""
+        if self._redis is not None:
+            start = -limit if limit else 0
+            return [json.loads(raw) for raw in self._redis.lrange(self._messages_key(session_id), start, -1)]
+
+        session = self._session(session_id)
+        history = list(session['messages']) if session else []
+        return history[-limit:] if limit else history
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, Any]]):
+        """Agrega mensajes a una sesión conservando solo los últimos `max_messages`"""
+        if self._redis is not None:
+            key = self._messages_key(session_id)
+            pipe = self._redis.pipeline()
+            pipe.rpush(key, *[json.dumps(msg) for msg in messages])
+            pipe.ltrim(key, -self.max_messages, -1)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+            return
+
+        self._session(session_id, create=True)['messages'].extend(messages)
+
+    def get_memory(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene la memoria resumida (resumen + pendientes) de una sesión"""
+        if self._redis is not None:
+            raw = self._redis.get(self._memory_key(session_id))
+            return json.loads(raw) if raw else None
+
+        session = self._session(session_id)
+        return session['memory'] if session else None
+
+    def set_memory(self, session_id: str, memory: Dict[str, Any]):
+        """Guarda la memoria resumida de una sesión"""
+        if self._redis is not None:
+            self._redis.set(self._memory_key(session_id), json.dumps(memory), ex=self.ttl)
+            return
+
+        self._session(session_id, create=True)['memory'] = memory
@@ -5,6 +5,7 @@ import json
 import re
 import os
 import uuid
+from collections import Counter
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from flask import jsonify
@@ -12,6 +13,23 @@ from loguru import logger
 import humanize
 from slugify import slugify
 
+# Expresiones compiladas una vez al importar el módulo
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^\+?1?\d{9,15}$')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+# Unidades de format_file_size (base 1024) y de _relative_time (de mayor a menor)
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+_TIME_UNITS = (('year', 31_536_000), ('month', 2_592_000), ('day', 86_400),
+               ('hour', 3600), ('minute', 60))
+
+# Palabras comunes a ignorar (stop words básicas en español e inglés)
+_STOP_WORDS = frozenset({
+    'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'como', 'las', 'del', 'los', 'una', 'al', 'pero',
+    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from'
+})
+
 def generate_uuid() -> str:
     """Generar UUID único"""
     return str(uuid.uuid4())
@@ -23,7 +41,7 @@ def generate_slug(text: str) -> str:
 def sanitize_filename(filename: str) -> str:
     """Sanitizar nombre de archivo"""
     # Remover caracteres no seguros
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = _UNSAFE_FILENAME_RE.sub('', filename)
     # Limitar longitud
     name, ext = os.path.splitext(filename)
     if len(name) > 50:
@@ -32,22 +50,56 @@ def sanitize_filename(filename: str) -> str:
 
 def validate_email(email: str) -> bool:
     """Validar formato de email"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_phone(phone: str) -> bool:
     """Validar formato de teléfono básico"""
-    pattern = r'^\+?1?\d{9,15}$'
-    return re.match(pattern, phone.replace(' ', '').replace('-', '')) is not None
+    return _PHONE_RE.match(phone.replace(' ', '').replace('-', '')) is not None
 
-def format_file_size(size_bytes: int) -> str:
-    """Formatear tamaño de archivo en formato legible"""
-    return humanize.naturalsize(size_bytes)
+def format_file_size(size_bytes: int, use_humanize: bool = False) -> str:
+    """Formatear tamaño de archivo en formato legible
 
-def format_datetime(dt: datetime, format_type: str = 'relative') -> str:
-    """Formatear datetime en formato legible"""
+    Por defecto usa un formateador propio en unidades binarias; `use_humanize=True`
+    delega en humanize.naturalsize (unidades decimales, más lento).
+    """
+    if use_humanize:
+        return humanize.naturalsize(size_bytes)
+    
+    size = float(size_bytes)
+    unit = 0
+    while abs(size) >= 1024 and unit < len(_SIZE_UNITS) - 1:
+        size /= 1024
+        unit += 1
+    if unit == 0:
+        return f"{size_bytes} {_SIZE_UNITS[0]}"
+    return f"{size:.1f} {_SIZE_UNITS[unit]}"
+
+def _relative_time(dt: datetime) -> str:
+    """Tiempo relativo aproximado ("3 minutes ago") con aritmética entera"""
+    seconds = round((datetime.now(dt.tzinfo) - dt).total_seconds())
+    suffix = 'ago' if seconds >= 0 else 'from now'
+    seconds = abs(seconds)
+    if seconds < 1:
+        return 'now'
+    
+    for unit, unit_seconds in _TIME_UNITS:
+        if seconds >= unit_seconds:
+            count = seconds // unit_seconds
+            break
+    else:
+        unit, count = 'second', seconds
+    if count == 1:
+        return f"{'an' if unit == 'hour' else 'a'} {unit} {suffix}"
+    return f"{count} {unit}s {suffix}"
+
+def format_datetime(dt: datetime, format_type: str = 'relative', use_humanize: bool = False) -> str:
+    """Formatear datetime en formato legible
+
+    El formato 'relative' usa un cálculo propio; `use_humanize=True` delega en
+    humanize.naturaltime, que redondea y combina unidades ("1 year, 1 month ago").
+    """
     if format_type == 'relative':
-        return humanize.naturaltime(dt)
+        return humanize.naturaltime(dt) if use_humanize else _relative_time(dt)
     elif format_type == 'date':
         return dt.strftime('%Y-%m-%d')
     elif format_type == 'datetime':
@@ -98,27 +150,24 @@ def safe_json_loads(json_string: str, default: Any = None) -> Any:
 
 def extract_keywords(text: str, max_keywords: int = 10) -> List[str]:
     """Extraer palabras clave básicas de un texto"""
-    # Remover caracteres especiales y convertir a minúsculas
-    clean_text = re.sub(r'[^\w\s]', '', text.lower())
+    # Con menos de 3 caracteres no puede haber ninguna palabra de más de 2
+    if not text or len(text) < 3:
+        return []
     
-    # Palabras comunes a ignorar (stop words básicas en español e inglés)
-    stop_words = {
-        'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'como', 'las', 'del', 'los', 'una', 'al', 'pero',
-        'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from'
-    }
+    # Remover caracteres especiales y convertir a minúsculas
+    clean_text = _NON_WORD_RE.sub('', text.lower())
     
     # Dividir en palabras y filtrar
-    words = [word for word in clean_text.split() 
-             if len(word) > 2 and word not in stop_words]
+    words = [word for word in clean_text.split()
+             if len(word) > 2 and word not in _STOP_WORDS]
     
-    # Contar frecuencias
-    word_count = {}
-    for word in words:
-        word_count[word] = word_count.get(word, 0) + 1
+    # Una sola palabra (títulos cortos): no hace falta contar
+    if len(words) <= 1:
+        return words[:max_keywords]
     
-    # Ordenar por frecuencia y retornar top keywords
-    sorted_words = sorted(word_count.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, count in sorted_words[:max_keywords]]
+    # Top keywords por frecuencia: most_common usa un heap y, en caso de empate,
+    # conserva el orden de aparición como hacía el sort estable
+    return [word for word, _ in Counter(words).most_common(max_keywords)]
 
 def create_directory_if_not_exists(path: str):
     """Crear directorio si no existe"""
@@ -0,0 +1,48 @@
+"""
+Proveedor JSON de Flask basado en orjson
+"""
+from collections import deque
+from types import MappingProxyType
+import orjson
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+def json_response(body: bytes, status: int = 200) -> Response:
+    """Respuesta JSON a partir de bytes ya serializados (cuerpos precalculados)"""
+    return Response(body, status=status, mimetype='application/json')
+
+def orjson_default(obj):
+    """`default` de orjson: vistas de solo lectura y deques, y lo que admite Flask"""
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    if isinstance(obj, deque):
+        return list(obj)
+    return DefaultJSONProvider.default(obj)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializa con orjson; los tipos que no soporta se delegan al proveedor por defecto"""
+
+    default = staticmethod(orjson_default)
+
+    def _options(self, **kwargs) -> int:
+        # Las fechas pasan por el proveedor por defecto para conservar el formato HTTP de Flask
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._options(**kwargs)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Se evita el paso intermedio por str: orjson ya produce bytes
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._options()),
+            mimetype=self.mimetype
+        )
@@ -0,0 +1,35 @@
+"""
+Configuración de logging con escritura en segundo plano
+"""
+import os
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+# (pid, listener) del proceso que lo arrancó: tras un fork el hilo no existe en el hijo
+_listener = None
+
+def configure_logging(level: str = 'INFO'):
+    """Envía los registros a una cola y los escribe en stderr desde un hilo aparte
+
+    Las peticiones solo encolan el registro; el formateo y la escritura no bloquean
+    el hilo que atiende la petición. Se puede volver a llamar tras un fork.
+    """
+    global _listener
+    if _listener is not None and _listener[0] == os.getpid():
+        _listener[1].stop()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    # El mensaje se formatea al encolar (con la traza incluida); el prefijo lo pone el listener
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    _listener = (os.getpid(), listener)
@@ -0,0 +1,36 @@
+"""
+Pruebas del asistente de IA
+"""
+import pytest
+from flask import Flask
+
+import src.routes.ai_assistant as assistant_module
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(assistant_module.ai_assistant_bp, url_prefix='/api/ai')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path, payload', [
+    ('/api/ai/chat', {'message': 'hola'}),
+    ('/api/ai/generate-code', {'description': 'una API'}),
+])
+@pytest.mark.parametrize('max_tokens', [True, False, 0, -5, '100', 1.5])
+def test_invalid_max_tokens_is_rejected(client, path, payload, max_tokens):
+    """max_tokens solo admite enteros positivos (bool no cuenta como entero)"""
+    response = client.post(path, json={**payload, 'max_tokens': max_tokens})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'max_tokens debe ser un entero positivo'}
+
+
+def test_resolve_max_tokens_ignores_bool():
+    """Un bool no se interpreta como límite de tokens"""
+    resolve = assistant_module.ai_assistant._resolve_max_tokens
+
+    assert resolve(True, 400) == 400
+    assert resolve(10_000, 400) == assistant_module.MAX_TOKENS_LIMIT
+    assert resolve(None, 400, 'hola') == assistant_module.SHORT_QUESTION_MAX_TOKENS
@@ -0,0 +1,97 @@
+"""
+Pruebas del asistente mejorado
+"""
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import src.routes.ai_assistant_enhanced as enhanced
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def assistant(monkeypatch):
+    assistant = enhanced.EnhancedAIAssistant()
+    if assistant.conversation_history.backend != 'memory':
+        pytest.skip('La prueba usa el almacenamiento en memoria')
+    monkeypatch.setattr(assistant, 'needs_internet_search', lambda message: False)
+    return assistant
+
+
+def test_summary_keeps_messages_from_concurrent_turns(assistant, monkeypatch):
+    """Los turnos que llegan durante un resumen en curso no pierden mensajes"""
+    release = threading.Event()
+    summarized = []
+
+    def create(model, messages, **kwargs):
+        if model != enhanced.SUMMARY_MODEL:
+            return _completion(f"respuesta {messages[-1]['content']}")
+        # El resumen se bloquea hasta que hayan llegado más turnos
+        summarized.append(messages[-1]['content'])
+        release.wait(5)
+        return _completion(f'resumen {len(summarized)}')
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(enhanced, 'get_openai_client', lambda: client)
+
+    turns = 10
+    for i in range(turns):
+        assistant.get_ai_response(f'mensaje-{i}', 'sesion')
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while assistant._summarizing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not assistant._summarizing
+
+    # Todo mensaje que salió de la ventana reciente está resumido o sigue pendiente
+    memory = assistant.conversation_history.get_memory('sesion')
+    pending = [msg['content'] for msg in memory['pending']]
+    recent_turns = enhanced.RECENT_MESSAGES // 2
+    for i in range(turns - recent_turns):
+        message = f'mensaje-{i}'
+        assert message in pending or any(message in transcript for transcript in summarized), message
+
+
+def test_conversation_endpoint_hides_token_counts(monkeypatch):
+    """/conversation conserva el esquema público de los mensajes"""
+    from flask import Flask
+
+    monkeypatch.setattr(enhanced.ai_assistant.conversation_history, 'get_messages', lambda session_id: [
+        {'role': 'user', 'content': 'hola', 'timestamp': '2024-01-01T00:00:00', 'tokens': 2}
+    ])
+    app = Flask(__name__)
+    app.register_blueprint(enhanced.ai_assistant_bp, url_prefix='/api/ai')
+
+    response = app.test_client().get('/api/ai/conversation/sesion')
+
+    assert response.status_code == 200
+    assert response.get_json()['history'] == [
+        {'role': 'user', 'content': 'hola', 'timestamp': '2024-01-01T00:00:00'}
+    ]
+
+
+def test_stored_turn_timestamps_match_response_precision(assistant, monkeypatch):
+    """Los mensajes guardados usan la misma marca de tiempo (en segundos) que la respuesta"""
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda model, messages, **kwargs: _completion('respuesta'))))
+    monkeypatch.setattr(enhanced, 'get_openai_client', lambda: client)
+
+    assistant.get_ai_response('hola', 'sesion')
+
+    for msg in assistant.conversation_history.get_messages('sesion'):
+        assert datetime.fromisoformat(msg['timestamp']).microsecond == 0
+        assert len(msg['timestamp']) == len('2024-01-01T00:00:00')
+
+
+def test_search_terms_split_on_every_non_word_character(assistant):
+    """Los términos de búsqueda conservan '_' y separan cualquier símbolo, no solo la puntuación ASCII"""
+    terms = assistant._extract_search_terms('¿precio_actual™ del bitcoin→hoy? ¡dímelo!')
+
+    assert terms.split() == ['precio_actual', 'bitcoin', 'hoy', 'dímelo']
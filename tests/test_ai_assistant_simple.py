@@ -0,0 +1,26 @@
+"""
+Pruebas del asistente simplificado
+"""
+import pytest
+
+from src.routes.ai_assistant_simple import SimpleAIAssistant
+
+
+@pytest.mark.parametrize('message, response', [
+    ('¿Cómo calculo números primos?', 'primos'),
+    ('Necesito un par de APIs REST', 'flask'),
+    ('Tengo varios servidores caídos', 'flask'),
+    ('¿Cómo reutilizo componentes?', 'react'),
+    ('holaaa, necesito ayuda', 'default'),
+])
+def test_chat_keywords_match_inflected_forms(message, response):
+    """Las palabras clave se buscan como subcadenas, igual que las formas flexionadas"""
+    assistant = SimpleAIAssistant()
+
+    assert assistant._build_response(message) == assistant.responses[response]
+
+
+def test_unknown_message_gets_generic_response():
+    assistant = SimpleAIAssistant()
+
+    assert assistant._build_response('¿Qué opinas de Rust?').startswith('Entiendo que preguntas sobre')
@@ -0,0 +1,23 @@
+"""
+Pruebas de las rutas del sandbox
+"""
+from flask import Flask
+
+from src.routes.sandbox import sandbox_bp
+
+
+def test_languages_exposes_only_public_configuration():
+    """/languages mantiene el esquema público: sin detalles internos de ejecución"""
+    app = Flask(__name__)
+    app.register_blueprint(sandbox_bp, url_prefix='/api/sandbox')
+
+    response = app.test_client().get('/api/sandbox/languages')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['languages'] == ['python', 'javascript', 'bash']
+    assert body['configurations']['python'] == {
+        'extension': '.py', 'command': ['python3'], 'timeout': 30, 'memory_limit': '128m'
+    }
+    for configuration in body['configurations'].values():
+        assert set(configuration) == {'extension', 'command', 'timeout', 'memory_limit'}
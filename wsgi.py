@@ -0,0 +1,9 @@
+"""
+Punto de entrada WSGI para gunicorn con workers gevent
+"""
+# Debe ejecutarse antes de cualquier otro import para que sockets, ssl y threading
+# queden parcheados y las llamadas bloqueantes (OpenAI, DuckDuckGo) cedan el control
+from gevent import monkey
+monkey.patch_all()
+
+from src.main import app  # noqa: E402